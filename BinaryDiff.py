@@ -0,0 +1,43 @@
+"""
+File: BinaryDiff.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Compares same-size files that are not code (images, PDFs, videos, archives) chunk by chunk through mmap.
+Only one chunk of each file is looked at at a time, and changed chunks are given as merged byte ranges.
+"""
+import os
+import mmap
+
+# bytes compared at a time, changed ranges are given in whole chunks
+CHUNK_SIZE = 65536
+# changed ranges given at most, the comparison stops after this many
+MAX_RANGES = 16
+
+
+# gives the changed byte ranges [(start, end), ...] of two same-size files, [] if identical
+# stops once max_ranges ranges are found (the last one may be longer)
+def changed_ranges(path1, path2, chunk_size=CHUNK_SIZE, max_ranges=MAX_RANGES):
+    size = os.path.getsize(path1)
+    if size != os.path.getsize(path2):
+        raise ValueError("files differ in size")
+    # empty files cannot be mapped
+    if size == 0:
+        return []
+
+    ranges = []
+    with open(path1, 'rb') as f1, open(path2, 'rb') as f2, \
+            mmap.mmap(f1.fileno(), 0, access=mmap.ACCESS_READ) as map1, \
+            mmap.mmap(f2.fileno(), 0, access=mmap.ACCESS_READ) as map2:
+        for start in range(0, size, chunk_size):
+            end = min(start + chunk_size, size)
+            if map1[start:end] == map2[start:end]:
+                continue
+            # next to the last changed chunk: one range
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], end)
+            elif len(ranges) == max_ranges:
+                break
+            else:
+                ranges.append((start, end))
+    return ranges
+
@@ -3,21 +3,34 @@ File: CodeChecker.py
 Author: Aidan David
 Date: 2024-01-29
 Description: Compares code files to help determine where similar code has be altered.
-Makes use of LinkChecker class to find and test links in a file.
+Makes use of LinkChecker class (through LinkPool) to find and test links in a file.
 """
 import os
-import re
 import difflib
-from LinkChecker import LinkChecker
+from LinkPool import LinkPool
+from LinkChecker import DEADLINE_CODE
+from LinkExtractor import get_link_index, is_absolute
+from LineDiff import iter_ndiff
+from TokenDiff import is_minified, diff_regions
 from prettytable import PrettyTable
 
 
+# code with more lines than this (both sides together) is diffed with LineDiff instead of difflib.ndiff
+NDIFF_MAX_LINES = 2000
+
+
 class CodeChecker:
-    def __init__(self, path1="", path2="", str1="", str2=""):
+    def __init__(self, path1="", path2="", str1="", str2="", normalizer=None, link_cache=None, link_budget=None):
         self.path1 = path1
         self.path2 = path2
         self.str1 = str1
         self.str2 = str2
+        # code is normalized (Normalizer) before it is compared, None to compare it as it is
+        self.normalizer = normalizer
+        # recent link results (LinkCache) used instead of testing again, None to always test
+        self.link_cache = link_cache
+        # seconds the link tests may take, links not tested by then are unchecked (deadline), None for no limit
+        self.link_budget = link_budget
         self.identical = True
         self.result = "Call compare() first"
 
@@ -29,16 +42,31 @@ class CodeChecker:
     def get_result(self):
         return self.result
 
+    # gives the lines normalized, or as they are without a normalizer
+    def normalize_lines(self, lines):
+        if self.normalizer is None:
+            return lines
+        return list(self.normalizer.iter_lines(lines))
+
+    # gives the text normalized, or as it is without a normalizer
+    def normalize_text(self, text):
+        if self.normalizer is None:
+            return text
+        return self.normalizer.normalize_text(text)
+
     # splits a string into strings of a max size
     def split_string(self, input_string, chunk_size):
         return [input_string[i:i + chunk_size] for i in range(0, len(input_string), chunk_size)]
 
-    # takes difflib content and organizes it into deletions, additions and mutual code (with colors and spacing)
-    def color_number_split(self, content, column_width):
-        # line numbers to help find changes in source code
-        line_num1 = 1
-        line_num2 = 1
+    # gives ndiff-style lines, small code keeps difflib.ndiff and large code uses LineDiff (no '? ' lines)
+    def diff_lines(self, lines1, lines2):
+        if len(lines1) + len(lines2) <= NDIFF_MAX_LINES:
+            return list(difflib.ndiff(lines1, lines2))
+        return list(iter_ndiff(lines1, lines2))
 
+    # takes difflib content and organizes it into deletions, additions and mutual code (with colors and spacing)
+    # line numbers can start later, for hunks; printed lines are collected in lists and joined once
+    def color_number_split(self, content, column_width, line_num1=1, line_num2=1):
         # printed lines to maintain line matching
         # i.e.   |1:+Hi      |           |
         #        |2: Hello   |1. Hello   |
@@ -47,56 +75,57 @@ class CodeChecker:
         pline1 = 1
         pline2 = 1
 
-        content1 = ""
-        content2 = ""
+        content1 = []
+        content2 = []
 
         for i, line in enumerate(content):
-            line_list = self.split_string(line, column_width)
             # lines not in either file
             if line[0] == '?':
                 pass
             # added lines
             elif line[0] == '+':
                 self.identical = False
+                line_list = self.split_string(line, column_width)
                 # color line number only to avoid colour bleed (green)
                 green_num = '\033[92m{}\033[0m'.format(line_num2)
-                #                                                                                    [1:] skips '+'
-                content2 = content2 + '\033[92m{}\033[0m'.format(f'{green_num}: {self.replace_tabs(line_list[0][1:])}')
+                #                                                                         [1:] skips '+'
+                content2.append('\033[92m{}\033[0m'.format(f'{green_num}: {self.replace_tabs(line_list[0][1:])}'))
                 # lines over max_width
                 for item in line_list[1:]:
-                    content2 = content2 + '\n' + item
+                    content2.append('\n' + item)
                     pline2 += 1
                 # previous deletion longer than addition
-                if pline1 > pline2:
-                    while pline1-1 > pline2:
-                        content2 = content2 + '\n'
-                        pline2 += 1
+                if pline1 - 1 > pline2:
+                    content2.append('\n' * (pline1 - 1 - pline2))
+                    pline2 = pline1 - 1
                 # increase counters
                 line_num2 += 1
                 pline2 += 1
             # deleted lines
             elif line[0] == '-':
                 self.identical = False
+                line_list = self.split_string(line, column_width)
                 # color line number only to avoid colour bleed (red)
                 red_num = '\033[91m{}\033[0m'.format(line_num1)
-                #                                                                                  [1:] skips '-'
-                content1 = content1 + '\033[91m{}\033[0m'.format(f'{red_num}: {self.replace_tabs(line_list[0][1:])}')
+                #                                                                       [1:] skips '-'
+                content1.append('\033[91m{}\033[0m'.format(f'{red_num}: {self.replace_tabs(line_list[0][1:])}'))
                 for item in line_list[1:]:
-                    content1 = content1 + '\n' + item
+                    content1.append('\n' + item)
                     pline1 += 1
                 # increase counters
                 line_num1 += 1
                 pline1 += 1
             # shared lines
             else:
+                line_list = self.split_string(line, column_width)
                 # color line number only to avoid colour bleed (white)
                 white_num = '\033[97m{}\033[0m'.format(line_num1)
-                content1 = content1 + f'{white_num}: {self.replace_tabs(line_list[0])}'
+                content1.append(f'{white_num}: {self.replace_tabs(line_list[0])}')
                 white_num = '\033[97m{}\033[0m'.format(line_num2)
-                content2 = content2 + f'{white_num}: {self.replace_tabs(line_list[0])}'
+                content2.append(f'{white_num}: {self.replace_tabs(line_list[0])}')
                 for item in line_list[1:]:
-                    content1 = content1 + '\n' + item
-                    content2 = content2 + '\n' + item
+                    content1.append('\n' + item)
+                    content2.append('\n' + item)
                 # increase counters
                 line_num1 += 1
                 line_num2 += 1
@@ -105,23 +134,106 @@ class CodeChecker:
             if pline1 > pline2:
                 # deletion followed by common line
                 if i < len(content) - 1 and content[i + 1][0] != '?' and content[i + 1][0] != '+':
-                    while pline1 > pline2:
-                        content2 = content2 + '\n'
-                        pline2 += 1
+                    content2.append('\n' * (pline1 - pline2))
+                    pline2 = pline1
             # additions make more printed lines
             elif pline1 < pline2:
-                while pline1 < pline2:
-                    content1 = content1 + '\n'
-                    pline1 += 1
+                content1.append('\n' * (pline2 - pline1))
+                pline1 = pline2
 
         # 2 full code sets colored and organized
-        return content1, content2
-
-    # strings to be compared line by line and put in table
-    def compare_strings(self):
+        return ''.join(content1), ''.join(content2)
+
+    # splits difflib content into hunks: changed lines with up to context shared lines around them
+    # gives ('hunk', lines, first line number 1, first line number 2) and ('same', number of lines skipped)
+    def split_hunks(self, content, context):
+        # '? ' lines are never shown
+        lines = [line for line in content if line[0] != '?']
+
+        # lines close enough to a change are kept
+        keep = [False] * len(lines)
+        last_change = None
+        for i, line in enumerate(lines):
+            if line[0] in '+-':
+                start = max(i - context, 0 if last_change is None else last_change + 1)
+                for j in range(start, i + 1):
+                    keep[j] = True
+                last_change = i
+            elif last_change is not None and i - last_change <= context:
+                keep[i] = True
+
+        hunks = []
+        line_num1 = 1
+        line_num2 = 1
+        i = 0
+        while i < len(lines):
+            # run of kept (or skipped) lines
+            j = i
+            while j < len(lines) and keep[j] == keep[i]:
+                j += 1
+            if keep[i]:
+                hunks.append(('hunk', lines[i:j], line_num1, line_num2))
+            else:
+                hunks.append(('same', j - i))
+            for line in lines[i:j]:
+                if line[0] != '+':
+                    line_num1 += 1
+                if line[0] != '-':
+                    line_num2 += 1
+            i = j
+        return hunks
+
+    # table rows for the differences: one row for the whole code, or with context a row per hunk
+    # and "N identical lines" markers in between
+    def diff_rows(self, diffs, column_width, context=None):
+        if context is None:
+            return [list(self.color_number_split(diffs, column_width))]
+
+        rows = []
+        for hunk in self.split_hunks(diffs, context):
+            if hunk[0] == 'hunk':
+                # the hunk's last line break would only add an empty line to the row
+                content1, content2 = self.color_number_split(hunk[1], column_width, hunk[2], hunk[3])
+                rows.append([content1.rstrip('\n'), content2.rstrip('\n')])
+            else:
+                marker = '\033[97m{}\033[0m'.format(f'... {hunk[1]} identical lines ...')
+                rows.append([marker, marker])
+        return rows
+
+    # one side of a changed byte range: the range, then its text (colored) between a margin of unchanged text
+    def token_region_cell(self, content, start, end, color, column_width, margin=30):
+        before = content[max(start - margin, 0):start]
+        changed = content[start:end]
+        after = content[end:end + margin]
+        # long changes are cut to fit the column
+        room = column_width - 2 * margin
+        if len(changed) > room:
+            changed = changed[:room - 3] + b'...'
+        text1, text2, text3 = (self.replace_tabs(part.decode('utf-8', errors='replace').replace('\n', '\\n'))
+                               for part in (before, changed, after))
+        return '\033[{}m{}\033[0m: {}\033[{}m{}\033[0m{}'.format(color, f'{start}-{end}', text1, color, text2, text3)
+
+    # table rows for minified code: a row per changed region (byte ranges), up to max_regions
+    def token_rows(self, content1, content2, column_width, max_regions=200):
+        regions = diff_regions(content1, content2)
+        self.identical = not regions
+        rows = []
+        for tag, start1, end1, start2, end2 in regions[:max_regions]:
+            rows.append([self.token_region_cell(content1, start1, end1, '91', column_width),
+                         self.token_region_cell(content2, start2, end2, '92', column_width)])
+        if len(regions) > max_regions:
+            marker = '\033[97m{}\033[0m'.format(f'... {len(regions) - max_regions} more changed regions ...')
+            rows.append([marker, marker])
+        return rows
+
+    # strings to be compared line by line and put in table, context (lines) shows only the changed parts
+    # with a normalizer, the normalized code is compared and shown
+    def compare_strings(self, context=None):
+        str1 = self.normalize_text(self.str1)
+        str2 = self.normalize_text(self.str2)
         # get lines from string
-        str1_lines = self.str1.splitlines()
-        str2_lines = self.str2.splitlines()
+        str1_lines = str1.splitlines()
+        str2_lines = str2.splitlines()
 
         # make them into proper line (newline)
         for i in range(0, len(str1_lines)-1):
@@ -130,12 +242,15 @@ class CodeChecker:
         for j in range(0, len(str2_lines)-1):
             str2_lines[j] = str2_lines[j] + '\n'
 
-        # get differences
-        diffs = list(difflib.ndiff(str1_lines, str2_lines))
-
         # column_width used to ensure code lines up correctly (feel free to change)
         column_width = 100
-        new_content1, new_content2 = self.color_number_split(diffs, column_width)
+        # minified code is compared by tokens, changes are given as byte ranges (UTF-8)
+        if is_minified(str1) or is_minified(str2):
+            rows = self.token_rows(str1.encode('utf-8'), str2.encode('utf-8'), column_width)
+        else:
+            # get differences
+            diffs = self.diff_lines(str1_lines, str2_lines)
+            rows = self.diff_rows(diffs, column_width, context)
 
         # print they are identical, else print code with differences
         if self.identical:
@@ -145,12 +260,12 @@ class CodeChecker:
                                  '\033[97m{}\033[0m'.format(f'Code 2')])
             table.align['\033[97m{}\033[0m'.format(f'Code 1')] = "l"
             table.align['\033[97m{}\033[0m'.format(f'Code 2')] = "l"
-            table.add_row([new_content1, new_content2])
+            table.add_rows(rows)
 
             self.result = table
 
-    # takes local path, makes strings to be compared line by line and put in table
-    def compare_files(self):
+    # takes local path, makes strings to be compared line by line and put in table, context as compare_strings
+    def compare_files(self, context=None):
         # make sure path points to a file
         if not os.path.isfile(self.path1):
             self.result = "First path does not point to a file!"
@@ -163,16 +278,28 @@ class CodeChecker:
         else:
             # read the files
             with open(self.path1, 'r', encoding='utf-8') as f:
-                content1 = f.readlines()
+                content1 = self.normalize_lines(f.readlines())
             with open(self.path2, 'r', encoding='utf-8') as f:
-                content2 = f.readlines()
-
-            # get differences
-            diffs = list(difflib.ndiff(content1, content2))
+                content2 = self.normalize_lines(f.readlines())
 
             # column_width used to ensure code lines up correctly (feel free to change)
             column_width = 100
-            new_content1, new_content2 = self.color_number_split(diffs, column_width)
+            # minified code is compared by tokens, changes are given as byte ranges of the files
+            # (of the normalized code, UTF-8, with a normalizer)
+            if is_minified(''.join(content1)) or is_minified(''.join(content2)):
+                if self.normalizer is None:
+                    with open(self.path1, 'rb') as f:
+                        raw1 = f.read()
+                    with open(self.path2, 'rb') as f:
+                        raw2 = f.read()
+                else:
+                    raw1 = ''.join(content1).encode('utf-8')
+                    raw2 = ''.join(content2).encode('utf-8')
+                rows = self.token_rows(raw1, raw2, column_width)
+            else:
+                # get differences
+                diffs = self.diff_lines(content1, content2)
+                rows = self.diff_rows(diffs, column_width, context)
 
             # print they are identical, else print code with differences
             if self.identical:
@@ -182,10 +309,60 @@ class CodeChecker:
                                      '\033[97m{}\033[0m'.format(f'Path 2: {self.path2}')])
                 table.align['\033[97m{}\033[0m'.format(f'Path 1: {self.path1}')] = "l"
                 table.align['\033[97m{}\033[0m'.format(f'Path 2: {self.path2}')] = "l"
-                table.add_row([new_content1, new_content2])
+                table.add_rows(rows)
 
                 self.result = table
 
+    # quick identical check without building a diff: sizes first, then a chunked byte comparison with early exit
+    # with a normalizer, sizes say nothing and the normalized code is compared instead
+    def quick_compare_files(self, size1=None, size2=None, chunk_size=65536):
+        # make sure paths point to files
+        if not os.path.isfile(self.path1) or not os.path.isfile(self.path2):
+            self.identical = False
+            self.result = "A path does not point to a file!"
+            return self.identical
+
+        # sizes can be passed in if already known
+        if size1 is None:
+            size1 = os.path.getsize(self.path1)
+        if size2 is None:
+            size2 = os.path.getsize(self.path2)
+
+        if self.normalizer is not None:
+            with open(self.path1, 'r', encoding='utf-8', errors='replace') as f1, \
+                    open(self.path2, 'r', encoding='utf-8', errors='replace') as f2:
+                self.identical = self.normalize_text(f1.read()) == self.normalize_text(f2.read())
+        # different sizes, no need to read
+        elif size1 != size2:
+            self.identical = False
+        else:
+            with open(self.path1, 'rb') as f1, open(self.path2, 'rb') as f2:
+                while True:
+                    chunk1 = f1.read(chunk_size)
+                    chunk2 = f2.read(chunk_size)
+                    # stop at the first difference
+                    if chunk1 != chunk2:
+                        self.identical = False
+                        break
+                    # end of both files
+                    if not chunk1:
+                        break
+
+        if self.identical:
+            self.result = "Files are identical!"
+        else:
+            self.result = "Files differ, use compare_files() to see the differences!"
+        return self.identical
+
+    # quick identical check for strings without building a diff
+    def quick_compare_strings(self):
+        self.identical = self.str1 == self.str2 or self.normalize_text(self.str1) == self.normalize_text(self.str2)
+        if self.identical:
+            self.result = "Files are identical!"
+        else:
+            self.result = "Files differ, use compare_strings() to see the differences!"
+        return self.identical
+
     # gives printable responses (local file)
     def check_links_print_file(self):
         # check if file
@@ -194,61 +371,71 @@ class CodeChecker:
         # read the file
         else:
             with open(self.path1, 'r', encoding='utf-8') as f:
-                content = f.readlines()
-
-            # use to test any links found in html file
-            lc = LinkChecker()
-
-            # to see when and if links found
-            links_list = []
-            line_num = 1
-            for line in content:
-                # regex to find URLs
-                regex = r'http[s]?://[^\s"<>\')]+'
-                matches = re.findall(regex, line)
-
-                # use link check on any links
-                if matches:
-                    for result in matches:
-                        links_list.append(f"URL found on line {line_num}: {result}")
-                        lc.link_check(result)
-                        status = lc.get_status()
-                        links_list.append(f"The URL above is {status}")
-                line_num += 1
-
-            if len(links_list) < 1:
-                return "No links found!"
-            return links_list
+                content = f.read()
 
-    # gives printable responses (local file)
+            return self.print_links(self.find_links(content))
+
+    # gives printable responses (str)
     def check_links_print_string(self):
-        # use to test any links found in html file
-        lc = LinkChecker()
+        return self.print_links(self.find_links(self.str1))
 
-        # get string in lines
-        lines = self.str1.splitlines()
+    # tests (line number, url) pairs and gives a printable response for each, in order
+    def print_links(self, links):
+        # every url is tested at the same time, once
+        checked = self.check_urls([result for line_num, result in links])
 
         # to see when and if links found
         links_list = []
-        line_num = 1
-        for line in lines:
-            # regex to find URLs
-            regex = r'http[s]?://[^\s"<>\')]+'
-            matches = re.findall(regex, line)
-
-            # use link check on any links
-            if matches:
-                for result in matches:
-                    links_list.append(f"URL found on line {line_num}: {result}")
-                    lc.link_check(result)
-                    status = lc.get_status()
-                    links_list.append(f"The URL above is {status}")
-            line_num += 1
+        for line_num, result in links:
+            links_list.append(f"URL found on line {line_num}: {result}")
+            links_list.append(f"The URL above is {checked[result].get_status()}")
 
         if len(links_list) < 1:
             return "No links found!"
         return links_list
 
+    # tests urls at the same time (LinkPool), gives url -> LinkChecker, a pool is made if none is given
+    def check_urls(self, urls, link_pool=None):
+        if link_pool is not None:
+            return link_pool.check_all(urls)
+        link_pool = LinkPool(cache=self.link_cache, time_budget=self.link_budget)
+        try:
+            return link_pool.check_all(urls)
+        finally:
+            link_pool.close()
+
+    # finds the absolute links of a text, gives (line number, url) pairs
+    # from LinkExtractor's link index, parsed once per content
+    def find_links(self, text):
+        return [(line_num, result) for line_num, result in get_link_index(text) if is_absolute(result)]
+
+    # finds every link of a text like find_links, relative ones too (resolved against a site, LinkResolver)
+    # content_hash is the text's sha1 if already known
+    def find_site_links(self, text, content_hash=None):
+        return get_link_index(text, content_hash)
+
+    # returns number for failed links in a list of (line number, url) pairs
+    # codes (url -> status code) can be shared between files, so each url is only tested once
+    # urls are tested at the same time, on link_pool if given
+    def check_links_list(self, links, codes=None, link_pool=None):
+        if codes is None:
+            codes = {}
+        untested = [result for line_num, result in links if result not in codes]
+        for result, lc in self.check_urls(untested, link_pool).items():
+            codes[result] = lc.get_code()
+
+        links_failed = 0  # 0 == all good, else 1+ failures, links unchecked at the deadline are not failures
+        for line_num, result in links:
+            if codes[result] >= 400 and codes[result] != DEADLINE_CODE:
+                links_failed += 1
+
+        return links_failed
+
+    # returns number of links in a list left unchecked when the time budget ran out, once check_links_list has
+    # filled codes in
+    def count_unchecked_links(self, links, codes):
+        return sum(codes.get(result) == DEADLINE_CODE for line_num, result in links)
+
     # returns number for failed links found in a file
     def check_links_file(self):
         # check if file
@@ -257,49 +444,10 @@ class CodeChecker:
         # read the file
         else:
             with open(self.path1, 'r', encoding='utf-8') as f:
-                content = f.readlines()
-
-            # use to test any links found in html file
-            lc = LinkChecker()
-
-            links_failed = 0  # 0 == all good, else 1+ failures
-            line_num = 1
-            for line in content:
-                # regex to find URLs
-                regex = r'http[s]?://[^\s"<>\')]+'
-                matches = re.findall(regex, line)
-
-                # use link check on any links
-                if matches:
-                    for result in matches:
-                        lc.link_check(result)
-                        if lc.get_code() >= 400:
-                            links_failed += 1
-                line_num += 1
-
-            return links_failed
-
-    # returns number for failed links found in a string
-    def check_links_string(self):
-        # use to test any links found in html file
-        lc = LinkChecker()
-
-        # get string in lines
-        lines = self.str1.splitlines()
-
-        links_failed = 0  # 0 == all good, else 1+ failures
-        line_num = 1
-        for line in lines:
-            # regex to find URLs
-            regex = r'http[s]?://[^\s"<>\')]+'
-            matches = re.findall(regex, line)
-
-            # use link check on any links
-            if matches:
-                for result in matches:
-                    lc.link_check(result)
-                    if lc.get_code() >= 400:
-                        links_failed += 1
-            line_num += 1
+                content = f.read()
 
-        return links_failed
+            return self.check_links_list(self.find_links(content))
+
+    # returns number for failed links found in a string, codes and link_pool as check_links_list
+    def check_links_string(self, codes=None, link_pool=None):
+        return self.check_links_list(self.find_links(self.str1), codes, link_pool)
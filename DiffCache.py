@@ -0,0 +1,69 @@
+"""
+File: DiffCache.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Keeps rendered code comparisons in memory, so a file pair opened again (by anyone) is not diffed again.
+Results are keyed by the content hashes of both sides and the render options, least recently used go first.
+"""
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+# sha1 of a file's content, read in chunks
+def hash_file(path, chunk_size=1048576):
+    content_hash = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            content_hash.update(chunk)
+    return content_hash.hexdigest()
+
+
+# sha1 of a string's content
+def hash_string(content):
+    return hashlib.sha1(content.encode('utf-8', errors='replace')).hexdigest()
+
+
+class DiffCache:
+    def __init__(self, max_entries=256, max_size=64 * 1048576):
+        # entry and size caps (characters of the results), least recently used results are evicted past them
+        self.max_entries = max_entries
+        self.max_size = max_size
+        # key -> result, least recently used first
+        self.entries = OrderedDict()
+        self.size = 0
+        # the web interface may serve several requests at once
+        self.lock = threading.Lock()
+
+    # key for two local files and the options, None if either is not a file (not cached)
+    # paths are part of the key, they are shown in the result's header
+    def file_key(self, path1, path2, *options):
+        if not os.path.isfile(path1) or not os.path.isfile(path2):
+            return None
+        return (path1, path2, hash_file(path1), hash_file(path2)) + options
+
+    # key for two strings (FTP files) and the options
+    def string_key(self, content1, content2, *options):
+        return (hash_string(content1), hash_string(content2)) + options
+
+    # gives the cached result, None if not cached
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                return None
+            self.entries.move_to_end(key)
+            return result
+
+    # keeps a result (str), results bigger than the size cap are not kept
+    def put(self, key, result):
+        if len(result) > self.max_size:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.size -= len(self.entries.pop(key))
+            self.entries[key] = result
+            self.size += len(result)
+            while len(self.entries) > self.max_entries or self.size > self.max_size:
+                self.size -= len(self.entries.popitem(last=False)[1])
@@ -5,67 +5,55 @@ Date: 2024-01-29
 Description: Compares directories/folders and files (from FTP) based on organization, size, and modification date.
 Can be further compared using CodeChecker (and LinkChecker)
 """
-import re
 import time
 from io import BytesIO
+from ftplib import error_perm
 from CodeChecker import CodeChecker
-from prettytable import PrettyTable
+from FileRecord import FileRecord, Found
+from Renderers import make_file_table, add_table_row
+from PathRules import PathRules
+from MinHash import make_sketch, estimate_similarity
+from LinkPool import LinkPool
+from LinkCache import LinkCache
 
 
 class FTPFileChecker:
-    def __init__(self, prod_ftp, dev_ftp, prod_path, dev_path, code_check=False, link_check=False):
+    def __init__(self, prod_ftp, dev_ftp, prod_path, dev_path, code_check=False, link_check=False, rules=None,
+                 normalizer=None, use_cache=True, recheck_links=False, link_budget=None):
         # sites to be compared
         self.prod_site = prod_ftp
         self.dev_site = dev_ftp
         # paths to be compared
         self.prod_path = prod_path
         self.dev_path = dev_path
+        # include/exclude rules, excluded directories are never listed or entered
+        self.rules = rules if rules is not None else PathRules()
         # to track files, avoid double printing
         self.processed_files = set()
+        # directories shared with the other side, (prefix, prod) -> number of directories
+        self.shared_depths = {}
         # possible extra checks/columns
         self.code_check = code_check
         self.link_check = link_check
-        # prettytable file info
-        # do code checks
-        if code_check and link_check:
-            self.file_table = PrettyTable([
-                '\033[97m{}\033[0m'.format("Filename"), '\033[97m{}\033[0m'.format("Found"),
-                '\033[97m{}\033[0m'.format("Code Match"),
-                '\033[97m{}\033[0m'.format("Links Failed (PROD.)"), '\033[97m{}\033[0m'.format("Links Failed (DEV.)"),
-                '\033[97m{}\033[0m'.format("Prod. Size (in Bytes)"), '\033[97m{}\033[0m'.format("Dev. Size (in Bytes)"),
-                '\033[97m{}\033[0m'.format("Prod. Modified"), '\033[97m{}\033[0m'.format("Dev. Modified")])
-        elif code_check:
-            self.file_table = PrettyTable([
-                '\033[97m{}\033[0m'.format("Filename"), '\033[97m{}\033[0m'.format("Found"),
-                '\033[97m{}\033[0m'.format("Code Match"), '\033[97m{}\033[0m'.format("Prod. Size (in Bytes)"),
-                '\033[97m{}\033[0m'.format("Dev. Size (in Bytes)"), '\033[97m{}\033[0m'.format("Prod. Modified"),
-                '\033[97m{}\033[0m'.format("Dev. Modified")])
-        # do link checks
-        elif link_check:
-            self.file_table = PrettyTable([
-                '\033[97m{}\033[0m'.format("Filename"), '\033[97m{}\033[0m'.format("Found"),
-                '\033[97m{}\033[0m'.format("Links Failed (PROD.)"), '\033[97m{}\033[0m'.format("Links Failed (DEV.)"),
-                '\033[97m{}\033[0m'.format("Prod. Size (in Bytes)"), '\033[97m{}\033[0m'.format("Dev. Size (in Bytes)"),
-                '\033[97m{}\033[0m'.format("Prod. Modified"), '\033[97m{}\033[0m'.format("Dev. Modified")])
-        # standard table
-        else:
-            self.file_table = PrettyTable([
-                '\033[97m{}\033[0m'.format("Filename"), '\033[97m{}\033[0m'.format("Found"),
-                '\033[97m{}\033[0m'.format("Prod. Size (in Bytes)"), '\033[97m{}\033[0m'.format("Dev. Size (in Bytes)"),
-                '\033[97m{}\033[0m'.format("Prod. Modified"), '\033[97m{}\033[0m'.format("Dev. Modified")])
-
-        # format local paths to the left
-        self.file_table.align['\033[97m{}\033[0m'.format("Filename")] = "l"
+        # url -> status code, each url found on the site is checked once
+        self.url_codes = {}
+        # links of a file are tested at the same time, made when link checking starts
+        self.link_pool = None
+        # link results kept on disk between runs, recheck_links tests every link again (and keeps the new results)
+        self.use_cache = use_cache
+        self.recheck_links = recheck_links
+        self.link_cache = None
+        # seconds the run's link tests may take, links not tested by then are not counted, None for no limit
+        self.link_budget = link_budget
+        # code is normalized (Normalizer) before it is compared, None to compare it as it is
+        self.normalizer = normalizer
+        # prettytable file info, with the extra columns
+        self.file_table = make_file_table(code_check, link_check)
 
     # returns table, for printing
     def get_file_table(self):
         return self.file_table
 
-    # undoes coloring, may or may not be required (safer)
-    def escape_ansi(self, str_in):
-        ansi_escape = re.compile(r'(\x9B|\x1B\[)[0-?]*[ -/]*[@-~]')
-        return ansi_escape.sub('', str_in)
-
     # check if item on ftp is a directory
     def is_dir(self, ftp_instance, path):
         # remember current directory
@@ -93,383 +81,180 @@ class FTPFileChecker:
         ftp_instance.retrbinary(f"RETR {path}", contents.write)
         return contents.getvalue().decode(encoding)
 
-    # color the directories before the file based on their matching
-    def color_prefix(self, prefix, prod=False):
-        # color matching, green; else yellow
-        if prod:
-            directories = prefix.split('/')
-            new_prefix = ""
-            for i, directory in enumerate(directories):
-                if i < len(directories) - 1:
-                    try:
-                        original_cwd = self.dev_site.pwd()
-                        #                                                   removes color for the comparison
-                        dir_match = self.dev_site.cwd(self.dev_path + '/' + self.escape_ansi(new_prefix) + directory)
-                        self.dev_site.cwd(original_cwd)
-                    except Exception as e:
-                        dir_match = False
-                    if not dir_match:
-                        new_prefix = new_prefix + '\033[93m{}\033[0m'.format(directory + '/')
-                    else:
-                        new_prefix = new_prefix + '\033[92m{}\033[0m'.format(directory + '/')
-
-        # color matching, green; else blue
-        else:
-            directories = prefix.split('/')
-            new_prefix = ""
-            for i, directory in enumerate(directories):
-                if i < len(directories) - 1:
-                    try:
-                        original_cwd = self.prod_site.pwd()
-                        #                                                   removes color for the comparison
-                        dir_match = self.prod_site.cwd(self.prod_path + '/' + self.escape_ansi(new_prefix) + directory)
-                        self.prod_site.cwd(original_cwd)
-                    except Exception as e:
-                        dir_match = False
-                    if not dir_match:
-                        new_prefix = new_prefix + '\033[94m{}\033[0m'.format(directory + '/')
-                    else:
-                        new_prefix = new_prefix + '\033[92m{}\033[0m'.format(directory + '/')
+    # number of directories in prefix (from the top) also found on the other ftp
+    def shared_depth(self, prefix, prod=False):
+        if not prefix:
+            return 0
+        key = (prefix, bool(prod))
+        # each directory is checked once, a missing subtree reuses its parent's depth
+        if key not in self.shared_depths:
+            parent, _, directory = prefix[:-1].rpartition('/')
+            parent_prefix = parent + '/' if parent else ""
+            parent_depth = self.shared_depth(parent_prefix, prod=prod)
+            # the whole parent must be shared for this directory to be, no need to check otherwise
+            if parent_depth == parent_prefix.count('/'):
+                if prod:
+                    found_other = self.is_dir(self.dev_site, self.dev_path + '/' + prefix[:-1])
+                else:
+                    found_other = self.is_dir(self.prod_site, self.prod_path + '/' + prefix[:-1])
+                self.shared_depths[key] = parent_depth + 1 if found_other else parent_depth
+            else:
+                self.shared_depths[key] = parent_depth
 
-        return new_prefix
+        return self.shared_depths[key]
 
-    # searches directory to get subdirectories and files
+    # lists a directory on an ftp, gives (name, True if directory) pairs sorted by name
+    # MLSD gives the types in one command, otherwise (nlst) each entry is checked with cwd
+    def list_directory(self, ftp_instance, dir_path, prefix=""):
+        try:
+            return sorted((name, facts.get('type') == 'dir')
+                          for name, facts in ftp_instance.mlsd(dir_path, facts=['type'])
+                          if facts.get('type') not in ('cdir', 'pdir'))
+        except error_perm:
+            entries = []
+            for entry in sorted(ftp_instance.nlst(dir_path)):
+                # names matching an exclude rule are skipped without checking if they are directories
+                if self.rules.is_excluded_dir(prefix + entry):
+                    continue
+                entries.append((entry, self.is_dir(ftp_instance, dir_path + '/' + entry)))
+            return entries
+
+    # searches directory to get subdirectories and files, gives their records
     def explore_directory(self, dir_path, prefix="", site2=False):
         if not site2:
-            for entry in self.prod_site.nlst(dir_path):
+            for entry, entry_is_dir in self.list_directory(self.prod_site, dir_path, prefix=prefix):
                 full_path = dir_path + '/' + entry
 
-                # add prefix and entry recursively call, or process them
-                if self.is_dir(self.prod_site, full_path):
-                    self.explore_directory(full_path, prefix=f"{prefix}{entry}/", site2=site2)
-                else:
+                # add prefix and entry recursively call (unless excluded), or process them
+                if entry_is_dir:
+                    if not self.rules.is_excluded_dir(prefix + entry):
+                        yield from self.explore_directory(full_path, prefix=f"{prefix}{entry}/", site2=site2)
+                elif self.rules.is_included_file(prefix + entry):
                     # Ensure super_path ends with a slash
                     super_path = self.prod_path.rstrip('/') + '/'
                     rel_path = full_path[len(super_path):]
 
-                    self.compare_add_row(rel_path, prefix=prefix, entry=entry)
+                    record = self.compare_record(rel_path, prefix=prefix, entry=entry)
+                    if record is not None:
+                        yield record
         else:
-            for entry in self.dev_site.nlst(dir_path):
+            for entry, entry_is_dir in self.list_directory(self.dev_site, dir_path, prefix=prefix):
                 full_path = dir_path + '/' + entry
 
-                # add prefix and entry recursively call, or process them
-                if self.is_dir(self.dev_site, full_path):
-                    self.explore_directory(full_path, prefix=f"{prefix}{entry}/", site2=site2)
-                else:
+                # add prefix and entry recursively call (unless excluded), or process them
+                if entry_is_dir:
+                    if not self.rules.is_excluded_dir(prefix + entry):
+                        yield from self.explore_directory(full_path, prefix=f"{prefix}{entry}/", site2=site2)
+                elif self.rules.is_included_file(prefix + entry):
                     # Ensure super_path ends with a slash
                     super_path = self.dev_path.rstrip('/') + '/'
                     rel_path = full_path[len(super_path):]
 
-                    self.compare_add_row(rel_path, prefix=prefix, entry=entry)
+                    record = self.compare_record(rel_path, prefix=prefix, entry=entry)
+                    if record is not None:
+                        yield record
 
-    # compares the entries to the table based on size, modification date (code, links)
-    def compare_add_row(self, rel_path, prefix="", entry=""):
+    # gives the modification time of a file on an ftp (seconds since epoch)
+    def modified_time(self, ftp_instance, path):
+        mod_time = ftp_instance.sendcmd(f"MDTM {path}")
+        return time.mktime(time.strptime(mod_time[4:], "%Y%m%d%H%M%S"))
+
+    # compares the entries based on size, modification date (code, links), gives their record
+    def compare_record(self, rel_path, prefix="", entry=""):
         # Process files only if not already processed
         full_path_key = prefix + '/' + entry
-        if full_path_key not in self.processed_files:
-            # add to set to avoid doubles
-            self.processed_files.add(full_path_key)
-
-            # get path before entry
-            prod = self.prod_path + rel_path
-            dev = self.dev_path + rel_path
-
-            # determine if file is found in production and development
-            prod_found = True if self.file_exists(self.prod_site, prod) else False
-            dev_found = True if self.file_exists(self.dev_site, dev) else False
-
-            # Standard colors (92==green)
-            match = '\033[92m'
-            found = '\033[92m{}\033[0m'.format("BOTH")
-            size = '\033[92m{}\033[0m'
-            change = '\033[92m{}\033[0m'
-            # initialize modified times
-            formatted_prod = ""
-            formatted_dev = ""
-
-            # switch ftp modes to Binary
-            self.prod_site.voidcmd('TYPE I')
-            self.dev_site.voidcmd('TYPE I')
-
-            # found in both
-            if prod_found and dev_found:
-                # if size and time differ, color red(==91)
-                if prod_found and dev_found and self.prod_site.size(prod) != self.dev_site.size(dev):
-                    size = '\033[91m{}\033[0m'
-
-                # get modification time
-                mod_time_prod = self.prod_site.sendcmd(f"MDTM {prod}")
-                # format
-                formatted_prod = time.ctime(time.mktime(time.strptime(mod_time_prod[4:], "%Y%m%d%H%M%S")))
-                # get modification time
-                mod_time_dev = self.dev_site.sendcmd(f"MDTM {dev}")
-                # format
-                formatted_dev = time.ctime(time.mktime(time.strptime(mod_time_dev[4:], "%Y%m%d%H%M%S")))
-                if prod_found and dev_found and formatted_prod != formatted_dev:
-                    change = '\033[91m{}\033[0m'
-
-            # found in production only (93==yellow), (97==white)
-            elif prod_found:
-                match = '\033[93m'
-                found = '\033[93m{}\033[0m'.format("PROD.")
-                size = '\033[97m{}\033[0m'
-                change = '\033[97m{}\033[0m'
-                # get modification time
-                mod_time_prod = self.prod_site.sendcmd(f"MDTM {prod}")
-                # format
-                formatted_prod = time.ctime(time.mktime(time.strptime(mod_time_prod[4:], "%Y%m%d%H%M%S")))
-
-            # found in development only (94==blue), (97==white)
-            else:
-                match = '\033[94m'
-                found = '\033[94m{}\033[0m'.format("DEV.")
-                size = '\033[97m{}\033[0m'
-                change = '\033[97m{}\033[0m'
-                # get modification time
-                mod_time_dev = self.dev_site.sendcmd(f"MDTM {dev}")
-                # format
-                formatted_dev = time.ctime(time.mktime(time.strptime(mod_time_dev[4:], "%Y%m%d%H%M%S")))
-
-            # only do search if user chose to
-            if self.code_check or self.link_check:
-                # standard that the column is empty
-                code_match = "n/a"
-                links_prod = "n/a"
-                links_dev = "n/a"
-                # determine if a file is code, if so apply code matching
-                is_code = False
-                # file extensions being looked for, add more if necessary
-                file_extension = ['.html', '.css', '.js', '.php', '.xml', '.ts', '.sql', '.json', '.py']
-                no_trail = entry.split('@')
-                for ext in file_extension:
-                    if no_trail[0].lower().endswith(ext):
-                        is_code = True
-
-                # if not code: irrelevant
-                if is_code:
-                    if self.code_check and self.link_check:
-                        # code compare
-                        if found == '\033[92m{}\033[0m'.format("BOTH"):
-                            path1 = self.prod_path + '/' + prefix + entry
-                            path2 = self.dev_path + '/' + prefix + entry
-                            content1 = self.read_file_from_ftp(self.prod_site, path1)
-                            content2 = self.read_file_from_ftp(self.dev_site, path2)
-                            
-                            cc = CodeChecker(str1=content1, str2=content2)
-                            cc.compare_strings()
-
-                            # green true for matching code, red false otherwise
-                            if cc.get_result() == "Files are identical!":
-                                code_match = '\033[92m{}\033[0m'.format("TRUE")
-                            else:
-                                code_match = '\033[91m{}\033[0m'.format("FALSE")
-                        else:
-                            code_match = "N/A"
-
-                        # link check
-                        # found in both file links
-                        if found == '\033[92m{}\033[0m'.format("BOTH"):
-                            # production file
-                            path = self.prod_path + '/' + prefix + entry
-                            content = self.read_file_from_ftp(self.prod_site, path)
-                            
-                            cc = CodeChecker(str1=content)
-                            links_failed = cc.check_links_string()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_prod = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_prod = '\033[92m{}\033[0m'.format(links_failed)
-
-                            # development file
-                            path = self.dev_path + '/' + prefix + entry
-                            content = self.read_file_from_ftp(self.dev_site, path)
-
-                            cc = CodeChecker(str1=content)
-                            links_failed = cc.check_links_string()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_dev = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_dev = '\033[92m{}\033[0m'.format(links_failed)
-
-                        # production file links
-                        elif found == '\033[93m{}\033[0m'.format("PROD."):
-                            path = self.prod_path + '/' + prefix + entry
-                            content = self.read_file_from_ftp(self.prod_site, path)
-
-                            cc = CodeChecker(str1=content)
-                            links_failed = cc.check_links_string()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_prod = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_prod = '\033[92m{}\033[0m'.format(links_failed)
-                            links_dev = "N/A"
-
-                        # development file links
-                        else:
-                            path = self.dev_path + '/' + prefix + entry
-                            content = self.read_file_from_ftp(self.dev_site, path)
-
-                            cc = CodeChecker(str1=content)
-                            links_failed = cc.check_links_string()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_dev = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_dev = '\033[92m{}\033[0m'.format(links_failed)
-                            links_prod = "N/A"
-
-                    elif self.code_check:
-                        # code compare
-                        if found == '\033[92m{}\033[0m'.format("BOTH"):
-                            path1 = self.prod_path + '/' + prefix + entry
-                            path2 = self.dev_path + '/' + prefix + entry
-                            content1 = self.read_file_from_ftp(self.prod_site, path1)
-                            content2 = self.read_file_from_ftp(self.dev_site, path2)
-
-                            cc = CodeChecker(str1=content1, str2=content2)
-                            cc.compare_strings()
-
-                            # green true for matching code, red false otherwise
-                            if cc.get_result() == "Files are identical!":
-                                code_match = '\033[92m{}\033[0m'.format("TRUE")
-                            else:
-                                code_match = '\033[91m{}\033[0m'.format("FALSE")
-                        else:
-                            code_match = "N/A"
-
-                    else:
-                        # link check
-                        # found in both file links
-                        if found == '\033[92m{}\033[0m'.format("BOTH"):
-                            # production file
-                            path = self.prod_path + '/' + prefix + entry
-                            content = self.read_file_from_ftp(self.prod_site, path)
-
-                            cc = CodeChecker(str1=content)
-                            links_failed = cc.check_links_string()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_prod = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_prod = '\033[92m{}\033[0m'.format(links_failed)
-
-                            # development file
-                            path = self.dev_path + '/' + prefix + entry
-                            content = self.read_file_from_ftp(self.dev_site, path)
-
-                            cc = CodeChecker(str1=content)
-                            links_failed = cc.check_links_string()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_dev = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_dev = '\033[92m{}\033[0m'.format(links_failed)
-
-                        # production file links
-                        elif found == '\033[93m{}\033[0m'.format("PROD."):
-                            path = self.prod_path + '/' + prefix + entry
-                            content = self.read_file_from_ftp(self.prod_site, path)
-
-                            cc = CodeChecker(str1=content)
-                            links_failed = cc.check_links_string()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_prod = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_prod = '\033[92m{}\033[0m'.format(links_failed)
-                            links_dev = "N/A"
-
-                        # development file links
-                        else:
-                            path = self.dev_path + '/' + prefix + entry
-                            content = self.read_file_from_ftp(self.dev_site, path)
-
-                            cc = CodeChecker(str1=content)
-                            links_failed = cc.check_links_string()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_dev = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_dev = '\033[92m{}\033[0m'.format(links_failed)
-                            links_prod = "N/A"
-
-                # standard empty
-                else:
-                    if self.code_check:
-                        code_match = "N/A"
-                    else:
-                        links_prod = "N/A"
-                        links_dev = "N/A"
-
-                # color path before file
-                if prod_found and dev_found:
-                    prefix = '\033[92m{}\033[0m'.format(prefix)
+        if full_path_key in self.processed_files:
+            return None
+        # add to set to avoid doubles
+        self.processed_files.add(full_path_key)
+
+        # get path before entry
+        prod = self.prod_path + rel_path
+        dev = self.dev_path + rel_path
+
+        # determine if file is found in production and development
+        prod_found = self.file_exists(self.prod_site, prod)
+        dev_found = self.file_exists(self.dev_site, dev)
+
+        # switch ftp modes to Binary
+        self.prod_site.voidcmd('TYPE I')
+        self.dev_site.voidcmd('TYPE I')
+
+        # sizes and modification times of whichever sides have the file
+        record = FileRecord(prefix, entry,
+                            prod_size=self.prod_site.size(prod) if prod_found else None,
+                            dev_size=self.dev_site.size(dev) if dev_found else None,
+                            prod_modified=self.modified_time(self.prod_site, prod) if prod_found else None,
+                            dev_modified=self.modified_time(self.dev_site, dev) if dev_found else None)
+
+        # only do search if user chose to, if not code: irrelevant
+        if (self.code_check or self.link_check) and self.rules.is_code(entry):
+            path1 = self.prod_path + '/' + prefix + entry
+            path2 = self.dev_path + '/' + prefix + entry
+            # file contents, each side is downloaded at most once
+            contents = {}
+
+            # code compare
+            if self.code_check and record.found == Found.BOTH:
+                # different sizes, no downloads needed (normalized code can still match)
+                if record.prod_size != record.dev_size and self.normalizer is None:
+                    record.code_match = False
                 else:
-                    prefix = self.color_prefix(prefix, prod=prod_found)
-
-                # add row with code and link check columns
-                if self.code_check and self.link_check:
-                    # add row based on above
-                    self.file_table.add_row([
-                        f"{prefix}{match}{entry}\033[0m",
-                        found, code_match, links_prod, links_dev,
-                        size.format(self.prod_site.size(prod)) if prod_found else "N/A",
-                        size.format(self.dev_site.size(dev)) if dev_found else "N/A",
-                        change.format(formatted_prod) if prod_found else "N/A",
-                        change.format(formatted_dev) if dev_found else "N/A"
-                    ])
-                # add row with code check column
-                elif self.code_check:
-                    # add row based on above
-                    self.file_table.add_row([
-                        f"{prefix}{match}{entry}\033[0m",
-                        found, code_match,
-                        size.format(self.prod_site.size(prod)) if prod_found else "N/A",
-                        size.format(self.dev_site.size(dev)) if dev_found else "N/A",
-                        change.format(formatted_prod) if prod_found else "N/A",
-                        change.format(formatted_dev) if dev_found else "N/A"
-                    ])
-                # add row with link check columns
-                else:
-                    # add row based on above
-                    self.file_table.add_row([
-                        f"{prefix}{match}{entry}\033[0m",
-                        found, links_prod, links_dev,
-                        size.format(self.prod_site.size(prod)) if prod_found else "N/A",
-                        size.format(self.dev_site.size(dev)) if dev_found else "N/A",
-                        change.format(formatted_prod) if prod_found else "N/A",
-                        change.format(formatted_dev) if dev_found else "N/A"
-                    ])
-
-            else:
-                # color path before file
-                if prod_found and dev_found:
-                    prefix = '\033[92m{}\033[0m'.format(prefix)
-                else:
-                    prefix = self.color_prefix(prefix, prod=prod_found)
-
-                # add row based on above
-                self.file_table.add_row([
-                    f"{prefix}{match}{entry}\033[0m",
-                    found,
-                    size.format(self.prod_site.size(prod)) if prod_found else "N/A",
-                    size.format(self.dev_site.size(dev)) if dev_found else "N/A",
-                    change.format(formatted_prod) if prod_found else "N/A",
-                    change.format(formatted_dev) if dev_found else "N/A"
-                ])
+                    contents[path1] = self.read_file_from_ftp(self.prod_site, path1)
+                    contents[path2] = self.read_file_from_ftp(self.dev_site, path2)
+                    # the diff is only built when the code comparison is opened
+                    cc = CodeChecker(str1=contents[path1], str2=contents[path2], normalizer=self.normalizer)
+                    record.code_match = cc.quick_compare_strings()
+                    # similarity is only 100% for matching code
+                    similarity = estimate_similarity(make_sketch(cc.normalize_text(contents[path1])),
+                                                     make_sketch(cc.normalize_text(contents[path2])))
+                    if record.code_match:
+                        record.similarity = 1.0
+                    elif similarity is not None:
+                        record.similarity = min(similarity, 0.99)
+
+            # link check, whichever sides have the file, links not tested by the deadline are counted apart
+            if self.link_check and prod_found:
+                if path1 not in contents:
+                    contents[path1] = self.read_file_from_ftp(self.prod_site, path1)
+                record.links_prod, record.unchecked_prod = self.count_links(contents[path1])
+            if self.link_check and dev_found:
+                if path2 not in contents:
+                    contents[path2] = self.read_file_from_ftp(self.dev_site, path2)
+                record.links_dev, record.unchecked_dev = self.count_links(contents[path2])
+
+        # directories before the file found on the other side
+        if record.found != Found.BOTH:
+            record.shared_depth = self.shared_depth(prefix, prod=record.found == Found.PROD)
+        return record
+
+    # numbers of failed and of unchecked (deadline) links in a file's contents, urls are tested once per run
+    def count_links(self, content):
+        cc = CodeChecker(str1=content)
+        links = cc.find_links(content)
+        failed = cc.check_links_list(links, self.url_codes, self.link_pool)
+        return failed, cc.count_unchecked_links(links, self.url_codes)
+
+    # adds a record to the table
+    def add_record_row(self, record):
+        add_table_row(self.file_table, record, self.code_check, self.link_check)
+
+    # explores both directories and gives a record for every file as soon as it is compared
+    def iter_records(self):
+        if self.link_check:
+            self.link_cache = LinkCache(refresh=self.recheck_links) if self.use_cache else None
+            self.link_pool = LinkPool(cache=self.link_cache, time_budget=self.link_budget)
+        try:
+            yield from self.explore_directory(self.prod_path)
+            yield from self.explore_directory(self.dev_path, site2=True)
+        finally:
+            if self.link_pool is not None:
+                self.link_pool.close(cancel=True)
+            if self.link_cache is not None:
+                self.link_cache.close()
+                self.link_cache = None
 
     # explores both directories to get every subdirectory and file to be compared
     def make_table(self):
-        self.explore_directory(self.prod_path)
-        self.explore_directory(self.dev_path, site2=True)
+        for record in self.iter_records():
+            self.add_record_row(record)
@@ -6,362 +6,526 @@ Description: Compares directories/folders and files based on organization, size,
 Can be further compared using CodeChecker (and LinkChecker)
 """
 import os
-import re
-import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
 from CodeChecker import CodeChecker
-from prettytable import PrettyTable
+from LinkExtractor import is_absolute
+from LinkPool import LinkPool
+from LinkCache import LinkCache
+from LinkResolver import LinkResolver, get_site_hosts
+from FingerprintCache import FingerprintCache, make_fingerprint
+from FileRecord import FileRecord, DirRecord, Found
+from MerkleTree import MerkleTree
+from MoveDetector import MoveDetector
+from MinHash import estimate_similarity
+from LineDiff import diff_file_stats
+from BinaryDiff import changed_ranges
+from PathRules import PathRules
+from Renderers import make_file_table, add_table_row
 
 
 class FileChecker:
-    def __init__(self, prod_site_in, dev_site_in, code_check=False, link_check=False):
+    def __init__(self, prod_site_in, dev_site_in, code_check=False, link_check=False, use_cache=True,
+                 io_workers=8, cpu_workers=None, net_workers=16, net_per_host=4, net_timeouts=(5, 15),
+                 batch_size=256, rules=None, recheck_links=False, local_links=False, site_hosts=None,
+                 changed_links=False, link_budget=None, collapse_identical=False, expand=None, detect_moves=False,
+                 normalizer=None, content_check=False, max_content_bytes=8589934592):
         # paths to be compared
         self.prod_site = prod_site_in
         self.dev_site = dev_site_in
-        # to track files, avoid double printing
-        self.processed_files = set()
+        # include/exclude rules, excluded directories are never entered
+        self.rules = rules if rules is not None else PathRules()
+        # directories (relative, no trailing '/') found on each side, filled during the walk
+        self.prod_dirs = set()
+        self.dev_dirs = set()
+        # directories shared with the other side, (prefix, prod) -> number of directories
+        self.shared_depths = {}
         # possible extra checks/columns
         self.code_check = code_check
         self.link_check = link_check
-        # prettytable file info
-        # do code checks
-        if code_check and link_check:
-            self.file_table = PrettyTable([
-                '\033[97m{}\033[0m'.format("Filename"), '\033[97m{}\033[0m'.format("Found"),
-                '\033[97m{}\033[0m'.format("Code Match"),
-                '\033[97m{}\033[0m'.format("Links Failed (PROD.)"), '\033[97m{}\033[0m'.format("Links Failed (DEV.)"),
-                '\033[97m{}\033[0m'.format("Prod. Size (in Bytes)"), '\033[97m{}\033[0m'.format("Dev. Size (in Bytes)"),
-                '\033[97m{}\033[0m'.format("Prod. Modified"), '\033[97m{}\033[0m'.format("Dev. Modified")])
-        elif code_check:
-            self.file_table = PrettyTable([
-                '\033[97m{}\033[0m'.format("Filename"), '\033[97m{}\033[0m'.format("Found"),
-                '\033[97m{}\033[0m'.format("Code Match"), '\033[97m{}\033[0m'.format("Prod. Size (in Bytes)"),
-                '\033[97m{}\033[0m'.format("Dev. Size (in Bytes)"), '\033[97m{}\033[0m'.format("Prod. Modified"),
-                '\033[97m{}\033[0m'.format("Dev. Modified")])
-        # do link checks
-        elif link_check:
-            self.file_table = PrettyTable([
-                '\033[97m{}\033[0m'.format("Filename"), '\033[97m{}\033[0m'.format("Found"),
-                '\033[97m{}\033[0m'.format("Links Failed (PROD.)"), '\033[97m{}\033[0m'.format("Links Failed (DEV.)"),
-                '\033[97m{}\033[0m'.format("Prod. Size (in Bytes)"), '\033[97m{}\033[0m'.format("Dev. Size (in Bytes)"),
-                '\033[97m{}\033[0m'.format("Prod. Modified"), '\033[97m{}\033[0m'.format("Dev. Modified")])
-        # standard table
-        else:
-            self.file_table = PrettyTable([
-                '\033[97m{}\033[0m'.format("Filename"), '\033[97m{}\033[0m'.format("Found"),
-                '\033[97m{}\033[0m'.format("Prod. Size (in Bytes)"), '\033[97m{}\033[0m'.format("Dev. Size (in Bytes)"),
-                '\033[97m{}\033[0m'.format("Prod. Modified"), '\033[97m{}\033[0m'.format("Dev. Modified")])
-
-        # format local paths to the left
-        self.file_table.align['\033[97m{}\033[0m'.format("Filename")] = "l"
+        # url -> future LinkChecker (status and code), each url found on the site is checked once per run
+        self.url_codes = {}
+        # links to the site itself (relative, or to site_hosts) looked up in each side's mirror instead of requested
+        # site_hosts default to the compared folders' names (wget names them after the host)
+        self.local_links = local_links
+        self.site_hosts = site_hosts
+        # (prod., dev.) LinkResolver, made when link checking starts
+        self.resolvers = (None, None)
+        # only changed links are requested first: a changed file's links found on one side only go before the ones
+        # both versions share, files that are the same on both sides reuse results (this run's or cached) and only
+        # request the links that have none, last
+        self.changed_links = changed_links
+        # seconds the run's link checks may take, links not tested by then are counted as unchecked, None for no limit
+        self.link_budget = link_budget
+        # identical subtrees given as one row (except expanded directories), every file is hashed for this
+        self.collapse_identical = collapse_identical
+        self.expand = expand
+        self.hash_files = collapse_identical
+        # files found on one side only are paired with same-content files on the other side (moved/renamed)
+        self.detect_moves = detect_moves
+        # code is normalized (Normalizer) before it is hashed and diffed, None to compare it as it is
+        self.normalizer = normalizer
+        # same-size files that are not code compared chunk by chunk (BinaryDiff), reading at most this much per run
+        self.content_check = content_check
+        self.max_content_bytes = max_content_bytes
+        self.content_bytes_left = max_content_bytes
+        # fingerprints (hash, links) kept on disk between runs, only needed when files are read
+        self.use_cache = use_cache
+        reads_files = code_check or link_check or collapse_identical or detect_moves
+        self.fingerprints = FingerprintCache() if use_cache and reads_files else None
+        # link results kept on disk between runs, recheck_links tests every link again (and keeps the new results)
+        self.recheck_links = recheck_links
+        self.link_cache = None
+        # worker pools used by iter_records: reads (I/O), fingerprints (CPU, processes), link checks (network)
+        # links are tested net_workers at a time, at most net_per_host per host, with (connect, read) timeouts
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.net_workers = net_workers
+        self.net_per_host = net_per_host
+        self.net_timeouts = net_timeouts
+        self.io_pool = None
+        self.cpu_pool = None
+        self.link_pool = None
+        # walked files checked together, records are given one batch at a time
+        self.batch_size = batch_size
+        # prettytable file info, with the extra columns
+        self.file_table = make_file_table(code_check, link_check, content_check=content_check)
 
     # returns table, for printing
     def get_file_table(self):
         return self.file_table
 
-    # undoes coloring, may or may not be required (safer)
-    def escape_ansi(self, str_in):
-        ansi_escape = re.compile(r'(\x9B|\x1B\[)[0-?]*[ -/]*[@-~]')
-        return ansi_escape.sub('', str_in)
-
-    # color the directories before the file based on their matching
-    def color_prefix(self, prefix, prod=False):
-        # color matching, green; else yellow
-        if prod:
-            directories = prefix.split('/')
-            new_prefix = ""
-            for i, directory in enumerate(directories):
-                if i < len(directories) - 1:
-                    #                                      removes color for the comparison
-                    if not os.path.exists(self.dev_site + '/' + self.escape_ansi(new_prefix) + directory):
-                        new_prefix = new_prefix + '\033[93m{}\033[0m'.format(directory + '/')
-                    else:
-                        new_prefix = new_prefix + '\033[92m{}\033[0m'.format(directory + '/')
-
-        # color matching, green; else blue
-        else:
-            directories = prefix.split('/')
-            new_prefix = ""
-            for i, directory in enumerate(directories):
-                if i < len(directories) - 1:
-                    #                                       removes color for the comparison
-                    if not os.path.exists(self.prod_site + '/' + self.escape_ansi(new_prefix) + directory):
-                        new_prefix = new_prefix + '\033[94m{}\033[0m'.format(directory + '/')
-                    else:
-                        new_prefix = new_prefix + '\033[92m{}\033[0m'.format(directory + '/')
-
-        return new_prefix
-
-    # searches directory to get subdirectories and files
-    def explore_directory(self, dir_path, prefix="", site2=False):
-        for entry in os.listdir(dir_path):
-            full_path = os.path.join(dir_path, entry)
-
-            # add prefix and entry recursively call, or process them
-            if os.path.isdir(full_path):
-                self.explore_directory(full_path, prefix=f"{prefix}{entry}/", site2=site2)
-            else:
-                # path dependent
-                if not site2:
-                    rel_path = os.path.relpath(full_path, self.prod_site)
-                else:
-                    rel_path = os.path.relpath(full_path, self.dev_site)
-
-                self.compare_add_row(rel_path, prefix=prefix, entry=entry)
-
-    # compares the entries to the table based on size, modification date (code, links)
-    def compare_add_row(self, rel_path, prefix="", entry=""):
-        # Process files only if not already processed
-        full_path_key = os.path.join(prefix, entry)
-        if full_path_key not in self.processed_files:
-            # add to set to avoid doubles
-            self.processed_files.add(full_path_key)
-
-            # get full file path(s)
-            prod = os.path.join(self.prod_site, rel_path)
-            dev = os.path.join(self.dev_site, rel_path)
-
-            # determine if file is found in production and development
-            prod_stats = os.stat(prod) if os.path.exists(prod) else False
-            dev_stats = os.stat(dev) if os.path.exists(dev) else False
-
-            # Standard colors (92==green)
-            match = '\033[92m'
-            found = '\033[92m{}\033[0m'.format("BOTH")
-            size = '\033[92m{}\033[0m'
-            change = '\033[92m{}\033[0m'
-
-            # found in both
-            if prod_stats and dev_stats:
-                # if size and time differ, color red(==91)
-                if prod_stats and dev_stats and prod_stats.st_size != dev_stats.st_size:
-                    size = '\033[91m{}\033[0m'
-                if prod_stats and dev_stats and time.ctime(prod_stats.st_mtime) != time.ctime(dev_stats.st_mtime):
-                    change = '\033[91m{}\033[0m'
-
-            # found in production only (93==yellow), (97==white)
-            elif prod_stats:
-                match = '\033[93m'
-                found = '\033[93m{}\033[0m'.format("PROD.")
-                size = '\033[97m{}\033[0m'
-                change = '\033[97m{}\033[0m'
-
-            # found in development only (94==blue), (97==white)
+    # number of directories in prefix (from the top) also found on the other side, answered from the walk's index
+    def shared_depth(self, prefix, prod=False):
+        if not prefix:
+            return 0
+        key = (prefix, bool(prod))
+        # each directory is looked up once, a missing subtree reuses its parent's depth
+        if key not in self.shared_depths:
+            parent, _, directory = prefix[:-1].rpartition('/')
+            parent_prefix = parent + '/' if parent else ""
+            parent_depth = self.shared_depth(parent_prefix, prod=prod)
+            other_dirs = self.dev_dirs if prod else self.prod_dirs
+            # the whole parent must be shared for this directory to be
+            if parent_depth == parent_prefix.count('/') and prefix[:-1] in other_dirs:
+                self.shared_depths[key] = parent_depth + 1
             else:
-                match = '\033[94m'
-                found = '\033[94m{}\033[0m'.format("DEV.")
-                size = '\033[97m{}\033[0m'
-                change = '\033[97m{}\033[0m'
-
-            # only do search if user chose to
-            if self.code_check or self.link_check:
-                # standard that the column is empty
-                code_match = "n/a"
-                links_prod = "n/a"
-                links_dev = "n/a"
-                # determine if a file is code, if so apply code matching
-                is_code = False
-                # file extensions being looked for, add more if necessary
-                file_extension = ['.html', '.css', '.js', '.php', '.xml', '.ts', '.sql', '.json', '.py']
-                no_trail = entry.split('@')
-                for ext in file_extension:
-                    if no_trail[0].lower().endswith(ext):
-                        is_code = True
-
-                # if not code: irrelevant
-                if is_code:
-                    if self.code_check and self.link_check:
-                        # code compare
-                        if found == '\033[92m{}\033[0m'.format("BOTH"):
-                            path1 = self.prod_site + '/' + prefix + entry
-                            path2 = self.dev_site + '/' + prefix + entry
-                            cc = CodeChecker(path1, path2)
-                            cc.compare_files()
-
-                            # green true for matching code, red false otherwise
-                            if cc.get_result() == "Files are identical!":
-                                code_match = '\033[92m{}\033[0m'.format("TRUE")
-                            else:
-                                code_match = '\033[91m{}\033[0m'.format("FALSE")
-                        else:
-                            code_match = "N/A"
-
-                        # link check
-                        # found in both file links
-                        if found == '\033[92m{}\033[0m'.format("BOTH"):
-                            # production file
-                            cc = CodeChecker(self.prod_site + '/' + prefix + entry)
-                            links_failed = cc.check_links_file()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_prod = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_prod = '\033[92m{}\033[0m'.format(links_failed)
-
-                            # development file
-                            cc = CodeChecker(self.dev_site + '/' + prefix + entry)
-                            links_failed = cc.check_links_file()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_dev = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_dev = '\033[92m{}\033[0m'.format(links_failed)
-
-                        # production file links
-                        elif found == '\033[93m{}\033[0m'.format("PROD."):
-                            cc = CodeChecker(self.prod_site + '/' + prefix + entry)
-                            links_failed = cc.check_links_file()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_prod = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_prod = '\033[92m{}\033[0m'.format(links_failed)
-                            links_dev = "N/A"
-
-                        # development file links
-                        else:
-                            cc = CodeChecker(self.dev_site + '/' + prefix + entry)
-                            links_failed = cc.check_links_file()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_dev = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_dev = '\033[92m{}\033[0m'.format(links_failed)
-                            links_prod = "N/A"
-
-                    elif self.code_check:
-                        # code compare
-                        if found == '\033[92m{}\033[0m'.format("BOTH"):
-                            path1 = self.prod_site + '/' + prefix + entry
-                            path2 = self.dev_site + '/' + prefix + entry
-                            cc = CodeChecker(path1, path2)
-                            cc.compare_files()
-
-                            # green true for matching code, red false otherwise
-                            if cc.get_result() == "Files are identical!":
-                                code_match = '\033[92m{}\033[0m'.format("TRUE")
-                            else:
-                                code_match = '\033[91m{}\033[0m'.format("FALSE")
-                        else:
-                            code_match = "N/A"
-
-                    else:
-                        # link check
-                        # found in both file links
-                        if found == '\033[92m{}\033[0m'.format("BOTH"):
-                            # production file
-                            cc = CodeChecker(self.prod_site + '/' + prefix + entry)
-                            links_failed = cc.check_links_file()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_prod = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_prod = '\033[92m{}\033[0m'.format(links_failed)
-
-                            # development file
-                            cc = CodeChecker(self.dev_site + '/' + prefix + entry)
-                            links_failed = cc.check_links_file()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_dev = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_dev = '\033[92m{}\033[0m'.format(links_failed)
-
-                        # production file links
-                        elif found == '\033[93m{}\033[0m'.format("PROD."):
-                            cc = CodeChecker(self.prod_site + '/' + prefix + entry)
-                            links_failed = cc.check_links_file()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_prod = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_prod = '\033[92m{}\033[0m'.format(links_failed)
-                            links_dev = "N/A"
-
-                        # development file links
-                        else:
-                            cc = CodeChecker(self.dev_site + '/' + prefix + entry)
-                            links_failed = cc.check_links_file()
-
-                            # green 0 for no failures, red number for failures
-                            if links_failed > 0:
-                                links_dev = '\033[91m{}\033[0m'.format(links_failed)
-                            else:
-                                links_dev = '\033[92m{}\033[0m'.format(links_failed)
-                            links_prod = "N/A"
-
-                # standard empty
+                self.shared_depths[key] = parent_depth
+
+        return self.shared_depths[key]
+
+    # lists a directory once, DirEntry objects keep the type (and on Windows the stat) info from the listing
+    def scan_directory(self, dir_path):
+        if dir_path is None:
+            return {}
+        with os.scandir(dir_path) as entries:
+            return {entry.name: entry for entry in entries}
+
+    # stats of a file entry, False if missing, a directory or unreadable (broken link)
+    def entry_stats(self, entry):
+        if entry is None:
+            return False
+        try:
+            if entry.is_dir():
+                return False
+            return entry.stat()
+        except OSError:
+            return False
+
+    # walks both directories in lockstep (sorted merge), gives every file once with both sides' stats
+    def explore_directories(self, prod_dir, dev_dir, prefix=""):
+        prod_entries = self.scan_directory(prod_dir)
+        dev_entries = self.scan_directory(dev_dir)
+
+        for entry in sorted(prod_entries.keys() | dev_entries.keys()):
+            prod_entry = prod_entries.get(entry)
+            dev_entry = dev_entries.get(entry)
+
+            # directories on either side, recursively explore whichever sides have it
+            prod_is_dir = prod_entry is not None and prod_entry.is_dir()
+            dev_is_dir = dev_entry is not None and dev_entry.is_dir()
+            # excluded directories are never entered
+            if (prod_is_dir or dev_is_dir) and not self.rules.is_excluded_dir(prefix + entry):
+                # index directories, for the shared parts of a prefix
+                if prod_is_dir:
+                    self.prod_dirs.add(prefix + entry)
+                if dev_is_dir:
+                    self.dev_dirs.add(prefix + entry)
+                yield from self.explore_directories(prod_entry.path if prod_is_dir else None,
+                                                    dev_entry.path if dev_is_dir else None,
+                                                    prefix=f"{prefix}{entry}/")
+
+            # files on either side, given together (excluded files are not stat'd)
+            if not self.rules.is_included_file(prefix + entry):
+                continue
+            prod_stats = self.entry_stats(prod_entry)
+            dev_stats = self.entry_stats(dev_entry)
+            if prod_stats or dev_stats:
+                yield prod_stats, dev_stats, prefix, entry
+
+    # directory record for a path, with where it was found
+    def make_dir_record(self, prefix):
+        if not prefix:
+            return DirRecord(prefix)
+        in_prod = prefix[:-1] in self.prod_dirs
+        in_dev = prefix[:-1] in self.dev_dirs
+        record = DirRecord(prefix, Found.BOTH if in_prod and in_dev else Found.PROD if in_prod else Found.DEV)
+        if record.found != Found.BOTH:
+            record.shared_depth = self.shared_depth(prefix, prod=record.found == Found.PROD)
+        return record
+
+    # gives a file's fingerprint from the cache, or starts making it in the process pool (future)
+    # links are only looked for in code files, and only code files are normalized
+    def request_fingerprint(self, path, stats, fingerprints, find_links=True):
+        if path not in fingerprints:
+            normalizer = self.normalizer if find_links else None
+            fingerprint = None
+            if self.fingerprints is not None:
+                fingerprint = self.fingerprints.lookup_fingerprint(path, stats, self.get_signature(normalizer),
+                                                                   find_links)
+            if fingerprint is None:
+                fingerprint = self.cpu_pool.submit(make_fingerprint, path, find_links, normalizer=normalizer)
+            fingerprints[path] = fingerprint
+        return fingerprints[path]
+
+    # signature of the normalization rules a fingerprint is made with, empty when not normalized
+    def get_signature(self, normalizer):
+        return normalizer.get_signature() if normalizer is not None else ""
+
+    # gives the urls of a file's links that are requested (network)
+    # with a resolver, links to the site itself are left for the mirror, relative links are never requested
+    def get_urls(self, links, resolver=None, page=""):
+        return {url for line_num, url in links
+                if is_absolute(url) and (resolver is None or resolver.resolve(page, url) is None)}
+
+    # starts checking urls that no other file has started
+    def request_urls(self, urls):
+        for url in urls:
+            if url not in self.url_codes:
+                self.url_codes[url] = self.link_pool.submit(url)
+
+    # starts checking the urls of a file's links
+    def request_links(self, links, resolver=None, page=""):
+        self.request_urls(self.get_urls(links, resolver, page))
+
+    # gives the urls with no result yet, neither requested this run nor cached
+    def get_uncached_urls(self, urls):
+        return {url for url in urls if url not in self.url_codes
+                and (self.link_cache is None or self.link_cache.lookup(url) is None)}
+
+    # starts checking the links of a file found on one or both sides (paths in links), when only changed links are
+    # checked: first the urls found on one side, gives the shared ones and the same file's uncached ones for later
+    # as (shared, unchanged)
+    def request_changed_links(self, prod_path, dev_path, fingerprints, links):
+        if prod_path in links and dev_path in links and fingerprints[prod_path].hash == fingerprints[dev_path].hash:
+            return set(), self.get_uncached_urls(self.get_urls(fingerprints[prod_path].links, *links[prod_path]))
+        prod_urls = self.get_urls(fingerprints[prod_path].links, *links[prod_path]) if prod_path in links else set()
+        dev_urls = self.get_urls(fingerprints[dev_path].links, *links[dev_path]) if dev_path in links else set()
+        self.request_urls(prod_urls ^ dev_urls)
+        return prod_urls & dev_urls, set()
+
+    # numbers of failed and of unchecked (deadline) links in a file's links (page is its path on the site)
+    # waits for their checks until the deadline, urls that were not requested use their cached result
+    # (None, None) if one has none
+    def count_links(self, links, resolver=None, page=""):
+        failed = 0
+        unchecked = 0
+        for line_num, url in links:
+            target = resolver.resolve(page, url) if resolver is not None else None
+            if target is not None:
+                failed += not resolver.exists(target)
+            elif not is_absolute(url):
+                continue
+            elif url in self.url_codes:
+                lc = self.link_pool.get_result(self.url_codes[url], url)
+                if lc.is_unchecked():
+                    unchecked += 1
                 else:
-                    if self.code_check:
-                        code_match = "N/A"
-                    else:
-                        links_prod = "N/A"
-                        links_dev = "N/A"
-
-                # color path before file
-                if prod_stats and dev_stats:
-                    prefix = '\033[92m{}\033[0m'.format(prefix)
-                else:
-                    prefix = self.color_prefix(prefix, prod=prod_stats)
-
-                # add row with code and link check columns
-                if self.code_check and self.link_check:
-                    # add row based on above
-                    self.file_table.add_row([
-                        f"{prefix}{match}{entry}\033[0m",
-                        found, code_match, links_prod, links_dev,
-                        size.format(prod_stats.st_size) if prod_stats else "N/A",
-                        size.format(dev_stats.st_size) if dev_stats else "N/A",
-                        change.format(time.ctime(round(prod_stats.st_mtime))) if prod_stats else "N/A",
-                        change.format(time.ctime(round(dev_stats.st_mtime))) if dev_stats else "N/A"
-                    ])
-                # add row with code check column
-                elif self.code_check:
-                    # add row based on above
-                    self.file_table.add_row([
-                        f"{prefix}{match}{entry}\033[0m",
-                        found, code_match,
-                        size.format(prod_stats.st_size) if prod_stats else "N/A",
-                        size.format(dev_stats.st_size) if dev_stats else "N/A",
-                        change.format(time.ctime(round(prod_stats.st_mtime))) if prod_stats else "N/A",
-                        change.format(time.ctime(round(dev_stats.st_mtime))) if dev_stats else "N/A"
-                    ])
-                # add row with link check columns
-                else:
-                    # add row based on above
-                    self.file_table.add_row([
-                        f"{prefix}{match}{entry}\033[0m",
-                        found, links_prod, links_dev,
-                        size.format(prod_stats.st_size) if prod_stats else "N/A",
-                        size.format(dev_stats.st_size) if dev_stats else "N/A",
-                        change.format(time.ctime(round(prod_stats.st_mtime))) if prod_stats else "N/A",
-                        change.format(time.ctime(round(dev_stats.st_mtime))) if dev_stats else "N/A"
-                    ])
-
+                    failed += lc.get_code() >= 400
             else:
-                # color path before file
-                if prod_stats and dev_stats:
-                    prefix = '\033[92m{}\033[0m'.format(prefix)
-                else:
-                    prefix = self.color_prefix(prefix, prod=prod_stats)
-
-                # add row based on above
-                self.file_table.add_row([
-                    f"{prefix}{match}{entry}\033[0m",
-                    found,
-                    size.format(prod_stats.st_size) if prod_stats else "N/A",
-                    size.format(dev_stats.st_size) if dev_stats else "N/A",
-                    change.format(time.ctime(round(prod_stats.st_mtime))) if prod_stats else "N/A",
-                    change.format(time.ctime(round(dev_stats.st_mtime))) if dev_stats else "N/A"
-                ])
+                cached = self.link_cache.lookup(url) if self.link_cache is not None else None
+                if cached is None:
+                    return None, None
+                failed += cached[1] >= 400
+        return failed, unchecked
+
+    # a dev. page's links to site files missing from dev. but found on prod., as (line number, url) pairs
+    def find_dev_only_links(self, links, page):
+        prod_resolver, dev_resolver = self.resolvers
+        dev_only = []
+        for line_num, url in links:
+            target = dev_resolver.resolve(page, url)
+            if target is not None and not dev_resolver.exists(target) and prod_resolver.exists(target):
+                dev_only.append((line_num, url))
+        return dev_only
+
+    # starts the checks for a batch of walked files: reads (I/O), fingerprints (CPU), and links (network)
+    def submit_batch(self, batch):
+        # path -> fingerprint, or future of one while it is being made
+        fingerprints = {}
+        # path -> stats, for caching new fingerprints
+        paths_stats = {}
+        # index -> future code match (without the cache)
+        code_matches = {}
+        # index -> future (added, removed, changed) lines of code that differs in size (without the cache)
+        line_changes = {}
+        # index -> future changed byte ranges of same-size files that are not code, [] when already known the same
+        content_ranges = {}
+        # path -> (resolver, path on the site) of the files whose links are checked
+        links = {}
+
+        for index, (prod_stats, dev_stats, prefix, entry) in enumerate(batch):
+            is_code = self.rules.is_code(entry)
+            prod_path = self.prod_site + '/' + prefix + entry
+            dev_path = self.dev_site + '/' + prefix + entry
+            paths_stats[prod_path] = prod_stats
+            paths_stats[dev_path] = dev_stats
+
+            # every file is hashed for the directory hashes, one-sided files for finding moves
+            if self.hash_files or (self.detect_moves and not (prod_stats and dev_stats)):
+                for path, stats in ((prod_path, prod_stats), (dev_path, dev_stats)):
+                    if stats:
+                        self.request_fingerprint(path, stats, fingerprints, is_code)
+
+            # not code, same size: compared chunk by chunk while the run's byte budget lasts
+            # unless cached hashes already show the same content
+            if self.content_check and not is_code and prod_stats and dev_stats and \
+                    prod_stats.st_size == dev_stats.st_size:
+                prod_fingerprint = fingerprints.get(prod_path)
+                dev_fingerprint = fingerprints.get(dev_path)
+                if prod_fingerprint is not None and dev_fingerprint is not None and \
+                        not isinstance(prod_fingerprint, Future) and not isinstance(dev_fingerprint, Future) and \
+                        prod_fingerprint.hash == dev_fingerprint.hash:
+                    content_ranges[index] = []
+                elif 2 * prod_stats.st_size <= self.content_bytes_left:
+                    self.content_bytes_left -= 2 * prod_stats.st_size
+                    content_ranges[index] = self.io_pool.submit(changed_ranges, prod_path, dev_path)
+
+            # if not code: irrelevant
+            if not (self.code_check or self.link_check) or not is_code:
+                continue
+
+            # code compare, fingerprints (hash and sketch) of both sides for the match and similarity
+            # without the cache, only same-size files are read (no similarity), unless the code is normalized
+            if self.code_check and prod_stats and dev_stats:
+                # different sizes always differ (normalized code may not), the line counts are started right away
+                # unless they can be cached, then they wait for both content hashes
+                if prod_stats.st_size != dev_stats.st_size and self.normalizer is None and self.fingerprints is None:
+                    line_changes[index] = self.cpu_pool.submit(diff_file_stats, prod_path, dev_path)
+                if self.fingerprints is not None or self.hash_files or self.normalizer is not None:
+                    self.request_fingerprint(prod_path, prod_stats, fingerprints)
+                    self.request_fingerprint(dev_path, dev_stats, fingerprints)
+                elif prod_stats.st_size == dev_stats.st_size:
+                    # the diff is only built when the code comparison is opened
+                    cc = CodeChecker(prod_path, dev_path)
+                    code_matches[index] = self.io_pool.submit(cc.quick_compare_files,
+                                                              prod_stats.st_size, dev_stats.st_size)
+
+            # link check, whichever sides have the file, from their fingerprints' links
+            # urls are checked once for the whole site, cached fingerprints start their checks right away
+            # (only changed links: once both sides' fingerprints are made)
+            if self.link_check:
+                for path, stats, resolver in zip((prod_path, dev_path), (prod_stats, dev_stats), self.resolvers):
+                    if stats:
+                        fingerprint = self.request_fingerprint(path, stats, fingerprints)
+                        links[path] = (resolver, prefix + entry)
+                        if not isinstance(fingerprint, Future) and not self.changed_links:
+                            self.request_links(fingerprint.links, resolver, prefix + entry)
+
+        return batch, fingerprints, paths_stats, code_matches, line_changes, content_ranges, links
+
+    # waits for a batch's checks and gives its records, in walk order
+    def settle_batch(self, batch, fingerprints, paths_stats, code_matches, line_changes, content_ranges, links):
+        # keep newly made fingerprints for the next run, written and committed together once they are all made
+        made = [path for path, fingerprint in fingerprints.items() if isinstance(fingerprint, Future)]
+        for path in made:
+            fingerprints[path] = fingerprints[path].result()
+        if self.fingerprints is not None and made:
+            for path in made:
+                # code files are the ones fingerprinted with links (request_fingerprint's find_links)
+                is_code = self.rules.is_code(os.path.basename(path))
+                normalizer = self.normalizer if is_code else None
+                self.fingerprints.put_fingerprint(path, paths_stats[path], fingerprints[path],
+                                                  self.get_signature(normalizer), is_code)
+            self.fingerprints.commit()
+        if self.changed_links:
+            # the urls both versions of a file share go after every one-sided url of the batch, and the urls of
+            # identical files that have no result yet (first run, expired, recheck) go last
+            shared = set()
+            unchanged = set()
+            for prod_stats, dev_stats, prefix, entry in batch:
+                file_shared, file_unchanged = self.request_changed_links(self.prod_site + '/' + prefix + entry,
+                                                                         self.dev_site + '/' + prefix + entry,
+                                                                         fingerprints, links)
+                shared |= file_shared
+                unchanged |= file_unchanged
+            self.request_urls(shared)
+            self.request_urls(unchanged)
+        else:
+            for path, (resolver, page) in links.items():
+                self.request_links(fingerprints[path].links, resolver, page)
+
+        records = []
+        for index, (prod_stats, dev_stats, prefix, entry) in enumerate(batch):
+            prod_path = self.prod_site + '/' + prefix + entry
+            dev_path = self.dev_site + '/' + prefix + entry
+            # stats come from the walk, False when the file is not found on that side
+            record = FileRecord(prefix, entry,
+                                prod_size=prod_stats.st_size if prod_stats else None,
+                                dev_size=dev_stats.st_size if dev_stats else None,
+                                prod_modified=prod_stats.st_mtime if prod_stats else None,
+                                dev_modified=dev_stats.st_mtime if dev_stats else None)
+
+            # content hashes, for the directory hashes
+            if prod_path in fingerprints:
+                record.prod_hash = fingerprints[prod_path].hash
+            if dev_path in fingerprints:
+                record.dev_hash = fingerprints[dev_path].hash
+
+            # one-sided code files keep their sketch, for pairing edited moves
+            if self.detect_moves and record.found != Found.BOTH:
+                fingerprint = fingerprints.get(prod_path if prod_stats else dev_path)
+                if fingerprint is not None:
+                    record.sketch = fingerprint.sketch
+
+            # code match, similarity and failed links stay None when not checked
+            # similarity is only 100% for matching code
+            is_code = self.code_check and self.rules.is_code(entry)
+            if index in code_matches:
+                record.code_match = code_matches[index].result()
+                record.similarity = 1.0 if record.code_match else None
+            elif is_code and prod_path in fingerprints and dev_path in fingerprints:
+                record.code_match = fingerprints[prod_path].hash == fingerprints[dev_path].hash
+                similarity = estimate_similarity(fingerprints[prod_path].sketch, fingerprints[dev_path].sketch)
+                if record.code_match:
+                    record.similarity = 1.0
+                elif similarity is not None:
+                    record.similarity = min(similarity, 0.99)
+            elif is_code and prod_stats and dev_stats:
+                record.code_match = False
+            # code that differs is only known now (or its counts waited for the hashes), its line counts are
+            # looked up by both content hashes, or started here
+            if record.code_match is False and index not in line_changes:
+                if self.fingerprints is not None and record.prod_hash is not None and record.dev_hash is not None:
+                    line_changes[index] = self.fingerprints.lookup_line_changes(
+                        record.prod_hash, record.dev_hash, self.get_signature(self.normalizer))
+                if line_changes.get(index) is None:
+                    line_changes[index] = self.cpu_pool.submit(diff_file_stats, prod_path, dev_path, self.normalizer)
+
+            # files that are not code and differ in size differ, no ranges are read
+            if self.content_check and not self.rules.is_code(entry) and prod_stats and dev_stats and \
+                    prod_stats.st_size != dev_stats.st_size:
+                record.content_match = False
+
+            if record.found != Found.BOTH:
+                record.shared_depth = self.shared_depth(prefix, prod=record.found == Found.PROD)
+            records.append((record, prod_path, dev_path))
+
+        # line counts, new ones are kept for the next run (committed before any record is given)
+        for index, (record, prod_path, dev_path) in enumerate(records):
+            if isinstance(line_changes.get(index), Future):
+                line_changes[index] = line_changes[index].result()
+                if self.fingerprints is not None and record.prod_hash is not None and record.dev_hash is not None:
+                    self.fingerprints.put_line_changes(record.prod_hash, record.dev_hash, line_changes[index],
+                                                       self.get_signature(self.normalizer))
+        if self.fingerprints is not None:
+            self.fingerprints.commit()
+
+        for index, (record, prod_path, dev_path) in enumerate(records):
+            if index in line_changes:
+                record.line_changes = line_changes[index]
+            if index in content_ranges:
+                ranges = content_ranges[index]
+                record.changed_ranges = ranges.result() if isinstance(ranges, Future) else ranges
+                record.content_match = not record.changed_ranges
+            if prod_path in links:
+                record.links_prod, record.unchecked_prod = self.count_links(fingerprints[prod_path].links,
+                                                                            *links[prod_path])
+            if dev_path in links:
+                record.links_dev, record.unchecked_dev = self.count_links(fingerprints[dev_path].links,
+                                                                          *links[dev_path])
+                if self.local_links:
+                    record.dev_only_links = self.find_dev_only_links(fingerprints[dev_path].links,
+                                                                     record.get_path())
+            yield record
+
+    # adds a record to the table
+    def add_record_row(self, record):
+        add_table_row(self.file_table, record, self.code_check, self.link_check, content_check=self.content_check)
+
+    # explores both directories and gives a record for every file as soon as its batch is checked
+    # files are checked in batches on the worker pools, a batch is given while the next one is being checked
+    # stopping early (closing the iterator) cancels the remaining checks
+    def iter_file_records(self):
+        self.io_pool = ThreadPoolExecutor(self.io_workers)
+        self.cpu_pool = ProcessPoolExecutor(self.cpu_workers)
+        # the link pool (and its DNS cache) and the link cache only exist while links are checked
+        if self.link_check:
+            self.link_cache = LinkCache(refresh=self.recheck_links) if self.use_cache else None
+            self.link_pool = LinkPool(self.net_workers, self.net_per_host, *self.net_timeouts, cache=self.link_cache,
+                                      time_budget=self.link_budget)
+        # both mirrors, for the links to the site itself (looked up as they are found)
+        if self.link_check and self.local_links:
+            site_hosts = self.site_hosts
+            if site_hosts is None:
+                site_hosts = get_site_hosts(self.prod_site) | get_site_hosts(self.dev_site)
+            self.resolvers = (LinkResolver(self.prod_site, site_hosts), LinkResolver(self.dev_site, site_hosts))
+        self.content_bytes_left = self.max_content_bytes
+        self.url_codes = {}
+        try:
+            pending = deque()
+            batch = []
+            for walked in self.explore_directories(self.prod_site, self.dev_site):
+                batch.append(walked)
+                if len(batch) >= self.batch_size:
+                    pending.append(self.submit_batch(batch))
+                    batch = []
+                    # keep one batch in flight while the oldest is given
+                    if len(pending) > 1:
+                        yield from self.settle_batch(*pending.popleft())
+            if batch:
+                pending.append(self.submit_batch(batch))
+            while pending:
+                yield from self.settle_batch(*pending.popleft())
+        finally:
+            for pool in (self.io_pool, self.cpu_pool):
+                pool.shutdown(cancel_futures=True)
+            if self.link_pool is not None:
+                self.link_pool.close(cancel=True)
+                self.link_pool = None
+            self.resolvers = (None, None)
+            if self.link_cache is not None:
+                self.link_cache.close()
+                self.link_cache = None
+            # keep fingerprints for the next run
+            if self.fingerprints is not None:
+                self.fingerprints.save()
+
+    # gives the file records, identical subtrees as one DirRecord when collapsing
+    # and one-sided files paired as moved/renamed (given once both sides are seen) when detecting moves
+    def iter_records(self):
+        file_records = self.iter_file_records()
+        records = file_records
+        try:
+            if self.collapse_identical:
+                records = MerkleTree(expand=self.expand, make_dir_record=self.make_dir_record).iter_records(records)
+            if self.detect_moves:
+                records = MoveDetector(self.rules.is_code if self.code_check else None).iter_records(records)
+            yield from records
+        finally:
+            file_records.close()
+
+    # gives a DirRecord for every directory, with its identical, changed, added and removed file counts
+    def make_summary(self):
+        self.hash_files = True
+        if self.use_cache and self.fingerprints is None:
+            self.fingerprints = FingerprintCache()
+        merkle_tree = MerkleTree(collapse=False, make_dir_record=self.make_dir_record)
+        for _ in merkle_tree.iter_records(self.iter_file_records()):
+            pass
+        return merkle_tree.get_summaries()
 
     # explores both directories to get every subdirectory and file to be compared
     def make_table(self):
-        self.explore_directory(self.prod_site)
-        self.explore_directory(self.dev_site, site2=True)
+        for record in self.iter_records():
+            self.add_record_row(record)
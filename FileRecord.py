@@ -0,0 +1,141 @@
+"""
+File: FileRecord.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Holds the comparison result of one file (or directory), as given by FileChecker and FTPFileChecker.
+Records only keep statuses and raw numbers, Renderers turns them into tables, HTML, JSON Lines or CSV.
+"""
+from enum import Enum
+
+
+# where a file was found, moved/renamed files are found on both sides at different paths
+class Found(Enum):
+    BOTH = "BOTH"
+    PROD = "PROD."
+    DEV = "DEV."
+    MOVED = "MOVED"
+    RENAMED = "RENAMED"
+
+
+class FileRecord:
+    # slots keep large comparisons small in memory
+    __slots__ = ("prefix", "entry", "found", "shared_depth", "prod_size", "dev_size", "prod_modified",
+                 "dev_modified", "code_match", "links_prod", "links_dev", "prod_hash", "dev_hash", "moved_from",
+                 "similarity", "sketch", "line_changes", "content_match", "changed_ranges", "dev_only_links",
+                 "unchecked_prod", "unchecked_dev")
+
+    def __init__(self, prefix, entry, prod_size=None, dev_size=None, prod_modified=None, dev_modified=None,
+                 code_match=None, links_prod=None, links_dev=None, prod_hash=None, dev_hash=None, similarity=None):
+        # directories before the file (ending with '/') and the file name
+        self.prefix = prefix
+        self.entry = entry
+        # sizes (in bytes) and modification times (seconds since epoch), None when not found on that side
+        self.prod_size = prod_size
+        self.dev_size = dev_size
+        self.prod_modified = prod_modified
+        self.dev_modified = dev_modified
+        # code match (True/False), estimated code similarity (0 to 1) and number of failed links, None when not checked
+        self.code_match = code_match
+        self.similarity = similarity
+        # (added, removed, changed) lines of differing code, None when not diffed
+        self.line_changes = None
+        # content match of files that are not code (True/False) and their changed byte ranges, None when not checked
+        self.content_match = None
+        self.changed_ranges = None
+        self.links_prod = links_prod
+        self.links_dev = links_dev
+        # links left unchecked when the time budget ran out (not counted as failed), None when not checked
+        self.unchecked_prod = None
+        self.unchecked_dev = None
+        # links on dev. that point at site files missing from dev. but found on prod., None when not resolved locally
+        self.dev_only_links = None
+        # content hashes, None when not read
+        self.prod_hash = prod_hash
+        self.dev_hash = dev_hash
+        # prod. path of a moved/renamed file (prefix and entry are the dev. path), set by MoveDetector
+        self.moved_from = None
+        # MinHash sketch of a code file found on one side only, for pairing edited moves
+        self.sketch = None
+
+        # where the file was found
+        if prod_size is not None and dev_size is not None:
+            self.found = Found.BOTH
+        elif prod_size is not None:
+            self.found = Found.PROD
+        else:
+            self.found = Found.DEV
+
+        # number of directories in prefix (from the top) found on both sides, set by the checker
+        self.shared_depth = self.get_depth() if self.found == Found.BOTH else 0
+
+    def __repr__(self):
+        if self.moved_from is not None:
+            return f"FileRecord({self.moved_from!r} -> {self.get_path()!r}, found={self.found.value!r})"
+        return f"FileRecord({self.get_path()!r}, found={self.found.value!r})"
+
+    # gives the file path, relative to the compared directories
+    def get_path(self):
+        return self.prefix + self.entry
+
+    # gives the number of directories in prefix
+    def get_depth(self):
+        return self.prefix.count('/')
+
+    # True if found on both sides with the same content
+    def is_identical(self):
+        return self.found == Found.BOTH and self.prod_hash is not None and self.prod_hash == self.dev_hash
+
+
+class DirRecord:
+    __slots__ = ("prefix", "found", "shared_depth", "files", "identical", "changed", "added", "removed",
+                 "prod_size", "dev_size", "prod_modified", "dev_modified", "code_match", "similarity",
+                 "line_changes", "content_match", "changed_ranges", "links_prod", "links_dev", "dev_only_links",
+                 "unchecked_prod", "unchecked_dev", "prod_hash", "dev_hash")
+
+    def __init__(self, prefix, found=Found.BOTH):
+        # directory path (ending with '/', empty for the compared directories themselves)
+        self.prefix = prefix
+        self.found = found
+        # number of directories in prefix (from the top) found on both sides, set by the checker
+        self.shared_depth = self.get_depth() if found == Found.BOTH else 0
+        # files in the whole subtree: total, same on both sides, different, only on dev. and only on prod.
+        self.files = 0
+        self.identical = 0
+        self.changed = 0
+        self.added = 0
+        self.removed = 0
+        # total sizes and latest modification times of the files, None when there are none on that side
+        self.prod_size = None
+        self.dev_size = None
+        self.prod_modified = None
+        self.dev_modified = None
+        # True when every code file matches, lowest code similarity, failed links summed, None when not checked
+        self.code_match = None
+        self.similarity = None
+        self.line_changes = None
+        # True when every file that is not code matches, None when not checked (byte ranges are per file only)
+        self.content_match = None
+        self.changed_ranges = None
+        self.links_prod = None
+        self.links_dev = None
+        self.dev_only_links = None
+        self.unchecked_prod = None
+        self.unchecked_dev = None
+        # Merkle hashes of the subtree (names, sizes and content hashes), None when empty on that side
+        self.prod_hash = None
+        self.dev_hash = None
+
+    def __repr__(self):
+        return f"DirRecord({self.get_path()!r}, files={self.files}, changed={self.changed})"
+
+    # gives the directory path, relative to the compared directories
+    def get_path(self):
+        return self.prefix or "./"
+
+    # gives the number of directories in the path
+    def get_depth(self):
+        return self.prefix.count('/')
+
+    # True if the subtree is the same on both sides
+    def is_identical(self):
+        return self.prod_hash is not None and self.prod_hash == self.dev_hash
@@ -0,0 +1,193 @@
+"""
+File: FingerprintCache.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Keeps content fingerprints (hash, line count, links and similarity sketch) of files in a local SQLite file.
+Entries are keyed by path, size, modification time, inode, kind (code or not) and normalization rules, so only
+changed files are read.
+Also keeps the (added, removed, changed) line counts of code pairs, keyed by both content hashes.
+"""
+import os
+import time
+import json
+import sqlite3
+import hashlib
+from collections import namedtuple
+from CodeChecker import CodeChecker
+from MinHash import make_sketch
+
+# default cache file, next to the program
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fingerprints.sqlite")
+
+# version of the table layout, older cache files are emptied
+CACHE_VERSION = 8
+
+# content hash, number of lines, links found as (line number, url) pairs and MinHash sketch (code files only)
+# links include relative ones (CodeChecker.find_site_links, LinkExtractor), only absolute urls are requested
+Fingerprint = namedtuple("Fingerprint", ["hash", "lines", "links", "sketch"], defaults=[None])
+
+
+# reads a file once to get its fingerprint, files that are not code are hashed in chunks without links or sketch
+# code is hashed and sketched after normalization (Normalizer) if given, links come from the code as it is
+def make_fingerprint(path, find_links=True, chunk_size=1048576, normalizer=None):
+    if not find_links:
+        content_hash = hashlib.sha1()
+        lines = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                content_hash.update(chunk)
+                lines += chunk.count(b'\n')
+        return Fingerprint(content_hash.hexdigest(), lines, [])
+
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    # links are found the same way CodeChecker finds them, once per content
+    text = content.decode('utf-8', errors='replace')
+    raw_hash = hashlib.sha1(content).hexdigest()
+    links = CodeChecker().find_site_links(text, raw_hash)
+
+    if normalizer is None:
+        return Fingerprint(raw_hash, len(text.splitlines()), links, make_sketch(text))
+
+    # hashed one normalized line at a time
+    content_hash = hashlib.sha1()
+    normalized = []
+    for line in normalizer.iter_lines(text.splitlines(keepends=True)):
+        content_hash.update(line.encode('utf-8', errors='replace'))
+        normalized.append(line)
+    return Fingerprint(content_hash.hexdigest(), len(text.splitlines()), links, make_sketch(''.join(normalized)))
+
+
+class FingerprintCache:
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, max_entries=500000, max_age_days=30, busy_timeout=5):
+        self.db_path = db_path
+        # size cap, least recently used entries are evicted past this
+        self.max_entries = max_entries
+        # entries not used for this long are evicted
+        self.max_age_days = max_age_days
+        # paths and code pairs used since the last save, 'used' times are written in one go
+        self.used_paths = set()
+        self.used_pairs = set()
+
+        # other comparisons may use the file at the same time: readers never wait for a writer (WAL),
+        # writes are short (committed per batch) and wait at most busy_timeout seconds for each other
+        self.connection = sqlite3.connect(self.db_path, timeout=busy_timeout)
+        try:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            pass
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS fingerprints")
+            self.connection.execute("DROP TABLE IF EXISTS line_changes")
+            self.connection.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS fingerprints ("
+            "path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, code INTEGER, "
+            "normalizer TEXT, hash TEXT, lines INTEGER, links TEXT, sketch TEXT, used REAL)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS fingerprints_used ON fingerprints (used)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS line_changes ("
+            "prod_hash TEXT, dev_hash TEXT, normalizer TEXT, added INTEGER, removed INTEGER, changed INTEGER, "
+            "used REAL, PRIMARY KEY (prod_hash, dev_hash, normalizer))")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS line_changes_used ON line_changes (used)")
+        self.connection.commit()
+
+    # gives the cached fingerprint of a file, None if it is not cached, changed since, normalized differently or
+    # made as another kind (find_links: code, with links and sketch), signature is the Normalizer's (empty if none)
+    def lookup_fingerprint(self, path, stats=None, signature="", find_links=True):
+        path = os.path.abspath(path)
+        # stats can be passed in if already known
+        if stats is None:
+            stats = os.stat(path)
+
+        row = self.connection.execute(
+            "SELECT hash, lines, links, sketch FROM fingerprints "
+            "WHERE path = ? AND size = ? AND mtime_ns = ? AND inode = ? AND code = ? AND normalizer = ?",
+            (path, stats.st_size, stats.st_mtime_ns, stats.st_ino, int(find_links), signature)).fetchone()
+
+        # new or changed file
+        if row is None:
+            return None
+
+        # unchanged file
+        self.used_paths.add(path)
+        sketch = tuple(json.loads(row[3])) if row[3] is not None else None
+        return Fingerprint(row[0], row[1], [tuple(link) for link in json.loads(row[2])], sketch)
+
+    # stores a fingerprint, made elsewhere (worker processes) with find_links as given, kept once committed
+    # the cache is only an aid: if another comparison holds the file too long, the fingerprint is not kept
+    def put_fingerprint(self, path, stats, fingerprint, signature="", find_links=True):
+        try:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (os.path.abspath(path), stats.st_size, stats.st_mtime_ns, stats.st_ino, int(find_links), signature,
+                 fingerprint.hash, fingerprint.lines, json.dumps(fingerprint.links),
+                 json.dumps(fingerprint.sketch) if fingerprint.sketch is not None else None, time.time()))
+        except sqlite3.OperationalError:
+            self.connection.rollback()
+
+    # gives the cached (added, removed, changed) line counts of two code files by their content hashes, None if not
+    # cached, signature is the Normalizer's the hashes and counts were made with (empty when not normalized)
+    def lookup_line_changes(self, prod_hash, dev_hash, signature=""):
+        row = self.connection.execute(
+            "SELECT added, removed, changed FROM line_changes WHERE prod_hash = ? AND dev_hash = ? AND normalizer = ?",
+            (prod_hash, dev_hash, signature)).fetchone()
+        if row is None:
+            return None
+        self.used_pairs.add((prod_hash, dev_hash, signature))
+        return tuple(row)
+
+    # stores the line counts of two code files, kept once committed (or dropped like fingerprints)
+    def put_line_changes(self, prod_hash, dev_hash, line_changes, signature=""):
+        try:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO line_changes VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (prod_hash, dev_hash, signature, *line_changes, time.time()))
+        except sqlite3.OperationalError:
+            self.connection.rollback()
+
+    # commits the stored fingerprints and line counts (once per batch), they are dropped if the file stays busy
+    def commit(self):
+        try:
+            self.connection.commit()
+        except sqlite3.OperationalError:
+            self.connection.rollback()
+
+    # removes old entries, then the least recently used ones past the size cap (of each table)
+    def evict(self):
+        oldest = time.time() - self.max_age_days * 86400
+        self.connection.execute("DELETE FROM fingerprints WHERE used < ?", (oldest,))
+        self.connection.execute("DELETE FROM line_changes WHERE used < ?", (oldest,))
+        count = self.connection.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM fingerprints WHERE path IN "
+                "(SELECT path FROM fingerprints ORDER BY used LIMIT ?)", (count - self.max_entries,))
+        count = self.connection.execute("SELECT COUNT(*) FROM line_changes").fetchone()[0]
+        if count > self.max_entries:
+            self.connection.execute(
+                "DELETE FROM line_changes WHERE rowid IN "
+                "(SELECT rowid FROM line_changes ORDER BY used LIMIT ?)", (count - self.max_entries,))
+
+    # writes use times, evicts and commits, skipped (until the next save) if the file stays busy
+    def save(self):
+        now = time.time()
+        try:
+            self.connection.executemany("UPDATE fingerprints SET used = ? WHERE path = ?",
+                                        [(now, path) for path in self.used_paths])
+            self.connection.executemany(
+                "UPDATE line_changes SET used = ? WHERE prod_hash = ? AND dev_hash = ? AND normalizer = ?",
+                [(now, *pair) for pair in self.used_pairs])
+            self.evict()
+            self.connection.commit()
+        except sqlite3.OperationalError:
+            self.connection.rollback()
+            return
+        self.used_paths = set()
+        self.used_pairs = set()
+
+    # saves and closes the database
+    def close(self):
+        self.save()
+        self.connection.close()
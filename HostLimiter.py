@@ -0,0 +1,56 @@
+"""
+File: HostLimiter.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Paces link tests to one host for LinkPool: a token bucket of requests per second, pauses asked for by
+the host (Retry-After), and a circuit breaker that gives up on a host after too many connection failures in a row.
+"""
+import time
+import threading
+
+
+class HostLimiter:
+    def __init__(self, rate=10, burst=10, max_failures=5):
+        # requests per second on average, and how many may go at once after a quiet time
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        # no requests before this time (Retry-After)
+        self.paused_until = 0
+        # connection failures in a row, the host is down at max_failures
+        self.max_failures = max_failures
+        self.failures = 0
+        # shared by the link testing threads
+        self.lock = threading.Lock()
+
+    # waits for a token (and the end of any pause), then takes it
+    def wait(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    delay = self.paused_until - now
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    # no requests to the host for this many seconds
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    # counts a connection failure, any answer from the host starts the count again (until it is down)
+    def record(self, failed):
+        with self.lock:
+            if self.failures < self.max_failures:
+                self.failures = self.failures + 1 if failed else 0
+
+    # True once the host failed max_failures times in a row
+    def is_down(self):
+        return self.failures >= self.max_failures
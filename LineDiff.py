@@ -0,0 +1,155 @@
+"""
+File: LineDiff.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Line diff for large files: patience diff over interned lines (each distinct line becomes a number).
+Gives ndiff-style lines for CodeChecker's side-by-side output, or only added/removed/changed counts.
+"""
+import difflib
+from bisect import bisect_left
+
+# regions without unique lines are diffed with difflib up to this size (lines1 * lines2), else replaced whole
+FALLBACK_LIMIT = 4000000
+
+
+# turns lines into numbers, equal lines get the same number
+def intern_lines(lines1, lines2):
+    numbers = {}
+    a = [numbers.setdefault(line, len(numbers)) for line in lines1]
+    b = [numbers.setdefault(line, len(numbers)) for line in lines2]
+    return a, b
+
+
+# gives the (i, j) pairs of lines found once in both regions, longest run in the same order (patience sorting)
+def unique_anchors(a, alo, ahi, b, blo, bhi):
+    # number -> [times in a, index in a, times in b, index in b]
+    seen = {}
+    for i in range(alo, ahi):
+        seen.setdefault(a[i], [0, i, 0, None])[0] += 1
+    for j in range(blo, bhi):
+        line = seen.get(b[j])
+        if line is not None:
+            line[2] += 1
+            line[3] = j
+    pairs = sorted((i, j) for a_times, i, b_times, j in seen.values() if a_times == 1 and b_times == 1)
+
+    # piles of j values, each pair remembers the top of the pile before it
+    tops = []
+    top_pairs = []
+    previous = []
+    for index, (i, j) in enumerate(pairs):
+        pile = bisect_left(tops, j)
+        previous.append(top_pairs[pile - 1] if pile else None)
+        if pile == len(tops):
+            tops.append(j)
+            top_pairs.append(index)
+        else:
+            tops[pile] = j
+            top_pairs[pile] = index
+
+    anchors = []
+    index = top_pairs[-1] if top_pairs else None
+    while index is not None:
+        anchors.append(pairs[index])
+        index = previous[index]
+    anchors.reverse()
+    return anchors
+
+
+# gives every matching (i, j) line pair of two number lists, in order
+def match_lines(a, b):
+    matches = []
+    regions = [(0, len(a), 0, len(b))]
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+        # same lines at the start and end need no search
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        # lines found once on each side split the region, the parts between them are searched the same way
+        anchors = unique_anchors(a, alo, ahi, b, blo, bhi)
+        if anchors:
+            i_start, j_start = alo, blo
+            for i, j in anchors:
+                regions.append((i_start, i, j_start, j))
+                matches.append((i, j))
+                i_start, j_start = i + 1, j + 1
+            regions.append((i_start, ahi, j_start, bhi))
+        # no unique lines (repeated lines only): difflib if small enough
+        elif (ahi - alo) * (bhi - blo) <= FALLBACK_LIMIT:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            for i, j, size in matcher.get_matching_blocks():
+                matches += [(alo + i + k, blo + j + k) for k in range(size)]
+
+    matches.sort()
+    return matches
+
+
+# gives difflib-style opcodes: (tag, i1, i2, j1, j2) with tags 'equal', 'replace', 'delete' and 'insert'
+def get_opcodes(lines1, lines2):
+    a, b = intern_lines(lines1, lines2)
+    opcodes = []
+    i = j = 0
+    for match_i, match_j in match_lines(a, b) + [(len(a), len(b))]:
+        if i < match_i and j < match_j:
+            opcodes.append(('replace', i, match_i, j, match_j))
+        elif i < match_i:
+            opcodes.append(('delete', i, match_i, j, j))
+        elif j < match_j:
+            opcodes.append(('insert', i, i, j, match_j))
+        if match_i == len(a):
+            break
+        # runs of matches are one 'equal'
+        if opcodes and opcodes[-1][0] == 'equal' and opcodes[-1][2] == match_i:
+            opcodes[-1] = ('equal', opcodes[-1][1], match_i + 1, opcodes[-1][3], match_j + 1)
+        else:
+            opcodes.append(('equal', match_i, match_i + 1, match_j, match_j + 1))
+        i, j = match_i + 1, match_j + 1
+    return opcodes
+
+
+# gives ndiff-style lines ('  ' shared, '- ' deleted, '+ ' added), without ndiff's '? ' hint lines
+def iter_ndiff(lines1, lines2):
+    for tag, i1, i2, j1, j2 in get_opcodes(lines1, lines2):
+        if tag == 'equal':
+            for line in lines1[i1:i2]:
+                yield '  ' + line
+            continue
+        for line in lines1[i1:i2]:
+            yield '- ' + line
+        for line in lines2[j1:j2]:
+            yield '+ ' + line
+
+
+# gives (added, removed, changed) line counts, replaced lines count as changed
+def diff_stats(lines1, lines2):
+    added = removed = changed = 0
+    for tag, i1, i2, j1, j2 in get_opcodes(lines1, lines2):
+        if tag == 'equal':
+            continue
+        both = min(i2 - i1, j2 - j1)
+        changed += both
+        removed += i2 - i1 - both
+        added += j2 - j1 - both
+    return added, removed, changed
+
+
+# reads two files and gives their (added, removed, changed) line counts, for worker processes
+# lines are normalized first if a Normalizer is given
+def diff_file_stats(path1, path2, normalizer=None):
+    with open(path1, 'r', encoding='utf-8', errors='replace') as f:
+        lines1 = f.read().splitlines()
+    with open(path2, 'r', encoding='utf-8', errors='replace') as f:
+        lines2 = f.read().splitlines()
+    if normalizer is not None:
+        lines1 = list(normalizer.iter_lines(lines1))
+        lines2 = list(normalizer.iter_lines(lines2))
+    return diff_stats(lines1, lines2)
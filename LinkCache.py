@@ -0,0 +1,116 @@
+"""
+File: LinkCache.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Keeps link test results (status and code) in a local SQLite file, so links tested recently are not
+requested again. Working, redirecting and failing links expire after their own times, and hosts that could not be
+found (DNS) are remembered so none of their links are requested until that expires.
+"""
+import os
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit
+
+# default cache file, next to the program
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "links.sqlite")
+
+# version of the table layout, older cache files are emptied
+CACHE_VERSION = 1
+
+
+class LinkCache:
+    def __init__(self, db_path=DEFAULT_CACHE_PATH, good_ttl=86400, redirect_ttl=21600, failure_ttl=3600,
+                 dns_ttl=3600, refresh=False, busy_timeout=5):
+        self.db_path = db_path
+        # seconds results are kept: working (below 300), redirecting (300s) and failing links, unknown hosts
+        self.good_ttl = good_ttl
+        self.redirect_ttl = redirect_ttl
+        self.failure_ttl = failure_ttl
+        self.dns_ttl = dns_ttl
+        # forced recheck: cached results are not used, new results are still kept
+        self.refresh = refresh
+        # shared by the link testing threads
+        self.lock = threading.Lock()
+
+        # other link checks may use the file at the same time: readers never wait for a writer (WAL),
+        # each result is committed as it is stored and writes wait at most busy_timeout seconds for each other
+        self.connection = sqlite3.connect(self.db_path, timeout=busy_timeout, check_same_thread=False)
+        try:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:
+            pass
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != CACHE_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS links")
+            self.connection.execute("DROP TABLE IF EXISTS hosts")
+            self.connection.execute(f"PRAGMA user_version = {CACHE_VERSION}")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS links (url TEXT PRIMARY KEY, status TEXT, code INTEGER, expires REAL)")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS hosts (host TEXT PRIMARY KEY, status TEXT, expires REAL)")
+        self.connection.commit()
+
+    # gives the host of a url, lowercase
+    def get_host(self, url):
+        return (urlsplit(url).hostname or "").lower()
+
+    # gives the cached (status, code) of a url, None if not cached, expired or refreshing
+    # links on a host that could not be found get that host's connection error
+    def lookup(self, url):
+        if self.refresh:
+            return None
+        now = time.time()
+        with self.lock:
+            try:
+                row = self.connection.execute("SELECT status, code FROM links WHERE url = ? AND expires > ?",
+                                              (url, now)).fetchone()
+                if row is None:
+                    host = self.connection.execute("SELECT status FROM hosts WHERE host = ? AND expires > ?",
+                                                   (self.get_host(url), now)).fetchone()
+                    # same code as any connection error
+                    row = (host[0], 429) if host is not None else None
+            except sqlite3.OperationalError:
+                row = None
+            if row is None:
+                return None
+            return row[0], row[1]
+
+    # stores and commits a url's (status, code), dns_failed when its host could not be found
+    # the cache is only an aid: if another link check holds the file too long, the result is not kept
+    def put(self, url, status, code, dns_failed=False):
+        if dns_failed:
+            ttl = self.dns_ttl
+        elif code < 300:
+            ttl = self.good_ttl
+        elif code < 400:
+            ttl = self.redirect_ttl
+        else:
+            ttl = self.failure_ttl
+        with self.lock:
+            try:
+                self.connection.execute("INSERT OR REPLACE INTO links VALUES (?, ?, ?, ?)",
+                                        (url, status, code, time.time() + ttl))
+                if dns_failed:
+                    self.connection.execute("INSERT OR REPLACE INTO hosts VALUES (?, ?, ?)",
+                                            (self.get_host(url), status, time.time() + ttl))
+                self.connection.commit()
+            except sqlite3.OperationalError:
+                self.connection.rollback()
+            # tests still running when the cache was closed (deadline) are not kept
+            except sqlite3.ProgrammingError:
+                pass
+
+    # removes expired results and commits, skipped (until the next save) if the file stays busy
+    def save(self):
+        now = time.time()
+        with self.lock:
+            try:
+                self.connection.execute("DELETE FROM links WHERE expires <= ?", (now,))
+                self.connection.execute("DELETE FROM hosts WHERE expires <= ?", (now,))
+                self.connection.commit()
+            except sqlite3.OperationalError:
+                self.connection.rollback()
+
+    # saves and closes the database
+    def close(self):
+        self.save()
+        self.connection.close()
@@ -4,14 +4,34 @@ Author: Aidan David
 Date: 2024-01-29
 Description: Tests an inputted link.
 """
+import time
+import socket
+from email.utils import parsedate_to_datetime
 import requests
 
+# code given to links that were not tested because their host stopped responding (circuit breaker)
+HOST_DOWN_CODE = 599
+# code given to links that were not tested because the run's time budget ran out, not a failure
+DEADLINE_CODE = 598
+# seconds to connect and to wait for a response
+DEFAULT_TIMEOUT = (5, 15)
+
 
 class LinkChecker:
-    def __init__(self):
+    def __init__(self, session=None, timeout=DEFAULT_TIMEOUT, cache=None):
         self.url = ""
         self.status = -1
         self.code = -1
+        # pooled Session (keep-alive) to test with, and (connect, read) timeout in seconds, None waits forever
+        self.session = session
+        self.timeout = timeout
+        # recent results (LinkCache) are used instead of a request, None to always request
+        self.cache = cache
+        # True if the last link's host could not be found, or could not be connected to at all
+        self.dns_failed = False
+        self.connection_failed = False
+        # seconds the server asked to wait before trying again (429/503 with Retry-After), None if not asked
+        self.retry_after = None
 
     # gives the link status, or tells the
     def get_status(self):
@@ -24,12 +44,61 @@ class LinkChecker:
     def get_code(self):
         return self.code
 
-    # actual testing of link
+    # tests a link, with a recent cached result if there is one
     def link_check(self, url):
+        if not self.lookup_link(url):
+            self.request_link(url)
+            self.store_link()
+
+    # uses a recent cached result for a link, False if there is none
+    def lookup_link(self, url):
+        if self.cache is None:
+            return False
+        cached = self.cache.lookup(url)
+        if cached is None:
+            return False
+        self.url = url
+        self.status, self.code = cached
+        self.dns_failed = False
+        self.connection_failed = False
+        self.retry_after = None
+        return True
+
+    # keeps the last result in the cache
+    def store_link(self):
+        if self.cache is not None:
+            self.cache.put(self.url, self.status, self.code, self.dns_failed)
+
+    # gives a link the host-down result without testing it
+    def host_down(self, url):
+        self.url = url
+        self.code = HOST_DOWN_CODE
+        self.status = "not tested, host stopped responding (code: " + '\033[91m{}\033[0m'.format(self.code) + ")"
+
+    # gives a link the deadline result without testing it
+    def deadline_passed(self, url):
         self.url = url
+        self.code = DEADLINE_CODE
+        self.status = '\033[93m{}\033[0m'.format("unchecked (deadline)")
+
+    # True if the link was not tested because the time budget ran out
+    def is_unchecked(self):
+        return self.code == DEADLINE_CODE
+
+    # actual testing of link
+    def request_link(self, url):
+        self.url = url
+        self.dns_failed = False
+        self.connection_failed = False
+        self.retry_after = None
         try:
             # test link, get response
-            response = requests.head(self.url, allow_redirects=True).status_code
+            head = self.session.head if self.session is not None else requests.head
+            result = head(self.url, allow_redirects=True, timeout=self.timeout)
+            response = result.status_code
+            # too many requests or unavailable: the server may say when to try again
+            if response in (429, 503):
+                self.retry_after = self.parse_retry_after(result.headers.get('Retry-After'))
             # response all good
             if isinstance(response, int) and 300 > response:
                 self.code = response
@@ -59,3 +128,25 @@ class LinkChecker:
         except requests.RequestException as e:
             self.status = "giving a connection error: " + '\033[91m{}\033[0m'.format(str(e))
             self.code = 429
+            self.dns_failed = self.is_dns_error(e)
+            self.connection_failed = True
+
+    # gives a Retry-After header (seconds or an HTTP date) in seconds from now, None if missing or unreadable
+    def parse_retry_after(self, value):
+        if not value:
+            return None
+        value = value.strip()
+        if value.isdigit():
+            return int(value)
+        try:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+        except (TypeError, ValueError):
+            return None
+
+    # True if the error (or one it came from) is a failed host lookup
+    def is_dns_error(self, error):
+        while error is not None:
+            if isinstance(error, socket.gaierror):
+                return True
+            error = error.__cause__ or error.__context__
+        return False
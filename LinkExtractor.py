@@ -0,0 +1,138 @@
+"""
+File: LinkExtractor.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Finds the links of a code file (HTML, CSS, JS, PHP...) in one pass over the whole text.
+Understands href/src/srcset/poster/action attributes of HTML tags, CSS url() and @import, and any other absolute
+http(s) url. <script> and <style> bodies are only searched for CSS urls and absolute urls, never for attributes.
+Gives a link index of (line number, url) pairs, kept in memory by content hash so identical files are parsed once.
+"""
+import re
+import html
+import hashlib
+import threading
+from collections import OrderedDict
+
+# links outside tags (and in tag attributes that are not links): a CSS url() or @import, or any absolute url
+TEXT_TOKENS = r"""
+    \burl\(\s*(?:"(?P<url_dq>[^"]*)"|'(?P<url_sq>[^']*)'|(?P<url_bare>[^\s"')]+))\s*\)
+    | @import\s+(?:"(?P<import_dq>[^"]*)"|'(?P<import_sq>[^']*)')
+    | (?P<absolute>https?://[^\s"<>')]+)
+"""
+TEXT_PATTERN = re.compile(TEXT_TOKENS, re.IGNORECASE | re.VERBOSE)
+
+# one token per tag, or per link outside tags: <script> and <style> take their body with them (up to their end tag)
+# a tag name is followed by whitespace, '/' or '>', so comparisons in code (a<b) are not tags
+TOKEN_PATTERN = re.compile(r"""
+    <(?P<raw_name>script|style)\b(?P<raw_attributes>(?:[^>"']|"[^"]*"|'[^']*')*)>
+        (?P<raw_body>.*?)(?:</(?P=raw_name)\s*>|\Z)
+    | <(?P<tag_name>[a-z][\w:-]*)(?=[\s/>])(?P<attributes>(?:[^>"']|"[^"]*"|'[^']*')*)>
+    | """ + TEXT_TOKENS, re.IGNORECASE | re.VERBOSE | re.DOTALL)
+
+# one attribute of a tag, with its quoted or bare value if it has one
+ATTRIBUTE_PATTERN = re.compile(r"""
+    (?P<name>[^\s"'<>/=]+)
+    (?:\s*=\s*(?:"(?P<dq>[^"]*)"|'(?P<sq>[^']*)'|(?P<bare>[^\s"'<>`]+)))?
+""", re.VERBOSE)
+
+# attributes whose whole value is a link (or a srcset list of them), other attributes are searched like text
+LINK_ATTRIBUTES = ("href", "src", "srcset", "poster", "action")
+
+# value groups of the text tokens, in the order they are tried
+VALUE_GROUPS = ("url_dq", "url_sq", "url_bare", "import_dq", "import_sq", "absolute")
+
+# values that are not links to a page or file
+SKIPPED_SCHEMES = ("#", "javascript:", "mailto:", "tel:", "data:", "about:")
+# template code left in a value (PHP, Jinja, JS template strings) is not a link
+TEMPLATE_MARKS = ("<", ">", "{{", "{%", "${")
+
+# link indexes kept in memory, by content hash
+MAX_INDEXES = 1024
+link_indexes = OrderedDict()
+index_lock = threading.Lock()
+
+
+# True for absolute http(s) urls, the only links that can be requested
+def is_absolute(url):
+    return url.lower().startswith(("http://", "https://"))
+
+
+# gives the urls of a token's value, srcset lists several ('image.png 2x, other.png 480w')
+def split_value(name, value):
+    value = value.strip()
+    if name == "srcset":
+        return [candidate.split()[0] for candidate in value.split(',') if candidate.strip()]
+    return [value]
+
+
+# gives the (position, url) pairs of a value's urls (name is the attribute it comes from, if any)
+def iter_value_links(position, value, name=None):
+    for url in split_value(name, value):
+        if not url or url.lower().startswith(SKIPPED_SCHEMES) or any(mark in url for mark in TEMPLATE_MARKS):
+            continue
+        yield position, url
+
+
+# gives the (position, url) pairs of text tokens (CSS urls and absolute urls), text starting at offset
+# values found in tag attributes are HTML (&amp; is '&')
+def iter_text_links(text, offset=0, in_tag=False):
+    for match in TEXT_PATTERN.finditer(text):
+        value = next(match.group(key) for key in VALUE_GROUPS if match.group(key) is not None)
+        yield from iter_value_links(offset + match.start(), html.unescape(value) if in_tag else value)
+
+
+# gives the (position, url) pairs of a tag's attributes (text starting at offset): a link attribute's whole value,
+# CSS urls and absolute urls in any other value (data-src, style, content...)
+def iter_tag_links(attributes, offset):
+    for match in ATTRIBUTE_PATTERN.finditer(attributes):
+        key = next((key for key in ("dq", "sq", "bare") if match.group(key) is not None), None)
+        if key is None:
+            continue
+        name = match.group("name").lower()
+        if name in LINK_ATTRIBUTES:
+            yield from iter_value_links(offset + match.start(), html.unescape(match.group(key)), name)
+        else:
+            yield from iter_text_links(match.group(key), offset + match.start(key), in_tag=True)
+
+
+# gives every (position, url) pair of a text, in order
+def iter_links(text):
+    for match in TOKEN_PATTERN.finditer(text):
+        if match.group("raw_name") is not None:
+            yield from iter_tag_links(match.group("raw_attributes"), match.start("raw_attributes"))
+            yield from iter_text_links(match.group("raw_body"), match.start("raw_body"))
+        elif match.group("tag_name") is not None:
+            yield from iter_tag_links(match.group("attributes"), match.start("attributes"))
+        else:
+            value = next(match.group(key) for key in VALUE_GROUPS if match.group(key) is not None)
+            yield from iter_value_links(match.start(), value)
+
+
+# gives every link in a text as (line number, url) pairs, in order
+def extract_links(text):
+    links = []
+    line_num = 1
+    position = 0
+    for start, url in iter_links(text):
+        # lines are counted from the last link on, the text is only read once
+        line_num += text.count('\n', position, start)
+        position = start
+        links.append((line_num, url))
+    return links
+
+
+# gives the link index of a text, parsed once per content (content_hash is its sha1 if already known)
+def get_link_index(text, content_hash=None):
+    if content_hash is None:
+        content_hash = hashlib.sha1(text.encode('utf-8', errors='replace')).hexdigest()
+    with index_lock:
+        links = link_indexes.get(content_hash)
+        if links is not None:
+            link_indexes.move_to_end(content_hash)
+            return links
+    links = extract_links(text)
+    with index_lock:
+        link_indexes[content_hash] = links
+        while len(link_indexes) > MAX_INDEXES:
+            link_indexes.popitem(last=False)
+    return links
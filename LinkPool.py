@@ -0,0 +1,204 @@
+"""
+File: LinkPool.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Tests many links at the same time with LinkChecker, keeping one pooled Session (keep-alive) per host.
+Limits how many links are tested at once overall and per host, with connect/read timeouts and cached DNS lookups.
+Each host is paced by a HostLimiter (requests per second, Retry-After pauses, and giving up on hosts that are down).
+An optional time budget ends the run on time: links not tested by then are given as unchecked (deadline).
+"""
+import time
+import socket
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+import requests
+from requests.adapters import HTTPAdapter
+from LinkChecker import LinkChecker
+from HostLimiter import HostLimiter
+
+# DNS answers are kept this long (seconds), and at most this many per pool
+DNS_TTL = 300
+MAX_DNS_ENTRIES = 1024
+
+# the pool a worker thread belongs to, other threads (FTP, the web app) look hosts up as usual
+worker_state = threading.local()
+system_getaddrinfo = socket.getaddrinfo
+# pools caching DNS answers: socket.getaddrinfo is replaced while there is one, and put back after the last closes
+dns_users = 0
+dns_lock = threading.Lock()
+
+
+# socket.getaddrinfo with the answers cached by the pool of the calling worker thread, so a host is looked up once
+# instead of once per link
+def cached_getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    pool = getattr(worker_state, "pool", None)
+    if pool is None:
+        return system_getaddrinfo(host, port, family, type, proto, flags)
+    return pool.lookup_host(host, port, family, type, proto, flags)
+
+
+# a pool starts caching DNS answers
+def use_cached_dns():
+    global dns_users
+    with dns_lock:
+        if dns_users == 0:
+            socket.getaddrinfo = cached_getaddrinfo
+        dns_users += 1
+
+
+# a pool stops caching DNS answers, the last one puts the system lookup back
+def release_cached_dns():
+    global dns_users
+    with dns_lock:
+        dns_users -= 1
+        if dns_users == 0 and socket.getaddrinfo is cached_getaddrinfo:
+            socket.getaddrinfo = system_getaddrinfo
+
+
+class LinkPool:
+    def __init__(self, max_workers=16, per_host=4, connect_timeout=5, read_timeout=15, cache_dns=True, cache=None,
+                 host_rate=10, max_failures=5, max_retries=2, max_retry_after=60, time_budget=None):
+        # links tested at once, overall and per host
+        self.max_workers = max_workers
+        self.per_host = per_host
+        # requests per second to a host, and connection failures in a row before its other links are not tested
+        self.host_rate = host_rate
+        self.max_failures = max_failures
+        # times a link is tried again when its host asks to wait (Retry-After), waiting at most max_retry_after
+        self.max_retries = max_retries
+        self.max_retry_after = max_retry_after
+        # seconds to connect and to wait for a response, a timeout is a connection error
+        self.timeout = (connect_timeout, read_timeout)
+        # recent results (LinkCache) used instead of requests, None to always request
+        self.cache = cache
+        # seconds the whole run may take (from now), None for no limit
+        self.deadline = time.monotonic() + time_budget if time_budget is not None else None
+        # host -> Session, host -> semaphore and host -> HostLimiter, made on first use
+        self.sessions = {}
+        self.host_limits = {}
+        self.limiters = {}
+        self.lock = threading.Lock()
+        # (host, port, family, type, proto, flags) -> (time looked up, answer), oldest first, for this pool's workers
+        self.cache_dns = cache_dns
+        self.dns_cache = {}
+        self.dns_lock = threading.Lock()
+        if cache_dns:
+            use_cached_dns()
+        self.pool = ThreadPoolExecutor(max_workers, initializer=self.start_worker)
+
+    # marks a worker thread as this pool's, so its DNS lookups use the pool's cache
+    def start_worker(self):
+        if self.cache_dns:
+            worker_state.pool = self
+
+    # gives a host's addresses (socket.getaddrinfo), looked up again once the answer is older than DNS_TTL
+    # expired and oldest answers are dropped to keep at most MAX_DNS_ENTRIES
+    def lookup_host(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self.dns_lock:
+            cached = self.dns_cache.get(key)
+        if cached is not None and now - cached[0] < DNS_TTL:
+            return cached[1]
+        answer = system_getaddrinfo(host, port, family, type, proto, flags)
+        with self.dns_lock:
+            self.dns_cache.pop(key, None)
+            self.dns_cache[key] = (now, answer)
+            for old_key, (looked_up, old_answer) in list(self.dns_cache.items()):
+                if now - looked_up < DNS_TTL and len(self.dns_cache) <= MAX_DNS_ENTRIES:
+                    break
+                del self.dns_cache[old_key]
+        return answer
+
+    # seconds left before the deadline (0 once passed), None without a time budget
+    def get_time_left(self):
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    # gives the host's Session, semaphore and HostLimiter, made once
+    def get_host(self, url):
+        parts = urlsplit(url)
+        host = (parts.scheme.lower(), parts.netloc.lower())
+        with self.lock:
+            if host not in self.sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.per_host)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self.sessions[host] = session
+                self.host_limits[host] = threading.BoundedSemaphore(self.per_host)
+                self.limiters[host] = HostLimiter(self.host_rate, self.per_host, self.max_failures)
+            return self.sessions[host], self.host_limits[host], self.limiters[host]
+
+    # tests a link (waiting for its host's pace and a free slot), gives its LinkChecker for the status and code
+    # links on a host that is down, or left when the deadline passes, are not tested (HOST_DOWN_CODE, DEADLINE_CODE)
+    # and those results are not cached
+    def check(self, url):
+        session, host_limit, limiter = self.get_host(url)
+        lc = LinkChecker(session=session, timeout=self.timeout, cache=self.cache)
+        if lc.lookup_link(url):
+            return lc
+
+        for attempt in range(self.max_retries + 1):
+            # a down host is checked before waiting and again once the slot is free (other links may have found it)
+            if not limiter.is_down():
+                limiter.wait()
+            with host_limit:
+                if limiter.is_down():
+                    lc.host_down(url)
+                    return lc
+                if self.get_time_left() == 0:
+                    lc.deadline_passed(url)
+                    return lc
+                lc.request_link(url)
+                limiter.record(lc.connection_failed)
+            # asked to wait: the whole host waits, then the link is tried again (if there is time for the wait)
+            if lc.retry_after is None or attempt == self.max_retries:
+                break
+            pause = min(lc.retry_after, self.max_retry_after)
+            time_left = self.get_time_left()
+            if time_left is not None and pause >= time_left:
+                break
+            limiter.pause(pause)
+
+        lc.store_link()
+        return lc
+
+    # starts testing a link, gives a future of its LinkChecker
+    def submit(self, url):
+        return self.pool.submit(self.check, url)
+
+    # gives a started test's LinkChecker, waiting at most until the deadline (then the link is unchecked)
+    def get_result(self, future, url):
+        try:
+            return future.result(timeout=self.get_time_left())
+        except TimeoutError:
+            lc = LinkChecker()
+            lc.deadline_passed(url)
+            return lc
+
+    # tests links at the same time, each url once, gives url -> LinkChecker
+    def check_all(self, urls):
+        futures = {}
+        for url in urls:
+            if url not in futures:
+                futures[url] = self.submit(url)
+        return {url: self.get_result(future, url) for url, future in futures.items()}
+
+    # stops the workers (tests not started yet are dropped if cancel), closes the Sessions and drops the DNS answers
+    # once the deadline has passed, tests still running are not waited for
+    def close(self, cancel=False):
+        passed = self.get_time_left() == 0
+        self.pool.shutdown(wait=not passed, cancel_futures=cancel or passed)
+        for session in self.sessions.values():
+            session.close()
+        self.sessions = {}
+        self.host_limits = {}
+        self.limiters = {}
+        if self.cache_dns:
+            self.cache_dns = False
+            release_cached_dns()
+        with self.dns_lock:
+            self.dns_cache = {}
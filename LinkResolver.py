@@ -0,0 +1,66 @@
+"""
+File: LinkResolver.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Resolves a mirrored site's own links (relative, or to one of the site's hosts) against the local copy,
+so they are checked by looking the file up in the mirror instead of requesting it (once per path, remembered).
+Assets saved by wget with their query string (style.css?ver=6.1, or style.css@ver=6.1 on Windows) are found too.
+"""
+import os
+from urllib.parse import urljoin, urlsplit, unquote
+
+# host standing in for the site when relative links are joined to a page
+LOCAL_HOST = "local.invalid"
+
+
+# hosts a mirror folder stands for: wget names it after the host (www.example.com), with and without 'www.'
+def get_site_hosts(root):
+    host = os.path.basename(os.path.normpath(root)).lower()
+    if '.' not in host:
+        return set()
+    bare = host[4:] if host.startswith("www.") else host
+    return {bare, "www." + bare}
+
+
+class LinkResolver:
+    def __init__(self, root, site_hosts=()):
+        # top of the mirror, the site's '/'
+        self.root = root
+        # hosts that are the site itself (lowercase)
+        self.site_hosts = {host.lower() for host in site_hosts}
+        # mirror path -> True if it was found, only the linked paths are looked up (once each)
+        self.found = {}
+
+    # gives the mirror path a link on a page (path relative to root) points at, None if it leaves the site
+    # (other hosts, mailto:, javascript:, ...), a query string is kept after '?' (wget saves it in the name)
+    # and fragments are dropped
+    def resolve(self, page, url):
+        parts = urlsplit(urljoin("http://" + LOCAL_HOST + "/" + page, url.strip()))
+        if parts.scheme not in ("http", "https"):
+            return None
+        host = (parts.hostname or "").lower()
+        if host != LOCAL_HOST and host not in self.site_hosts:
+            return None
+        path = unquote(parts.path).lstrip('/')
+        return path + '?' + parts.query if parts.query else path
+
+    # True if a mirror path is a file, or a directory with an index page (wget saves '/' as index.html)
+    # pages saved with an added .html (wget --adjust-extension) are found too
+    def exists(self, path):
+        if path not in self.found:
+            self.found[path] = self.find(path)
+        return self.found[path]
+
+    # looks a mirror path up on disk, paths leaving the mirror ('..') are never found
+    # with a query, the file saved with it ('?', or '@' on Windows) is looked for first, then the path without it
+    def find(self, path):
+        path, _, query = path.partition('?')
+        root = os.path.normpath(self.root)
+        full_path = os.path.normpath(os.path.join(root, path))
+        if full_path != root and not full_path.startswith(root.rstrip(os.sep) + os.sep):
+            return False
+        names = [] if path.endswith('/') else [full_path, full_path + ".html"]
+        names.append(os.path.join(full_path, "index.html"))
+        if query:
+            names = [name + mark + query for name in names[:1] + names[-1:] for mark in "?@"] + names
+        return any(os.path.isfile(name) for name in names)
@@ -0,0 +1,148 @@
+"""
+File: MerkleTree.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Hashes directories from their children (names, sizes and content hashes) as records stream past,
+so identical subtrees can be shown as one row and every directory gets changed/added/removed counts.
+"""
+import hashlib
+from FileRecord import DirRecord
+
+
+class MerkleTree:
+    def __init__(self, collapse=True, expand=None, make_dir_record=None):
+        # identical subtrees are given as one DirRecord instead of their files
+        self.collapse = collapse
+        # directories (relative paths) whose files are always given, even when identical (so their parents are
+        # never collapsed either)
+        self.expand = {path.strip().strip('/') + '/' if path.strip().strip('/') not in ('', '.') else ''
+                       for path in expand or []}
+        # makes the DirRecord of a directory path, so the checker can set where it was found
+        self.make_dir_record = make_dir_record if make_dir_record is not None else DirRecord
+        # closed directories, for the summary
+        self.summaries = []
+        # open directories, top first: [DirRecord, prod. hash, dev. hash, held back rows (None once changed)]
+        self.stack = []
+
+    # gives every closed directory's DirRecord, sorted by path
+    def get_summaries(self):
+        return sorted(self.summaries, key=lambda record: record.prefix)
+
+    # gives the records, identical subtrees collapsed, as soon as a directory is known to differ
+    # rows are only held back while every open directory is identical so far
+    def iter_records(self, records):
+        self.stack = [self.open_directory("")]
+        for record in records:
+            # close the directories the record is not in, open the ones down to it
+            while not record.prefix.startswith(self.stack[-1][0].prefix):
+                yield from self.close_directory()
+            while self.stack[-1][0].prefix != record.prefix:
+                prefix = self.stack[-1][0].prefix
+                name = record.prefix[len(prefix):].split('/')[0]
+                self.stack.append(self.open_directory(prefix + name + '/'))
+
+            self.add_file(record)
+            # a different file makes every directory above it different, held back rows are given
+            if not record.is_identical():
+                yield from self.release()
+            yield from self.give(record)
+
+        while self.stack:
+            yield from self.close_directory()
+
+    # a directory's state, rows are only held back when collapsing
+    def open_directory(self, prefix):
+        return [self.make_dir_record(prefix), hashlib.sha1(), hashlib.sha1(), [] if self.collapse else None]
+
+    # True for an expanded directory and the directories above one
+    def is_expanded(self, prefix):
+        return any(path.startswith(prefix) for path in self.expand)
+
+    # holds a row back in the innermost directory, or gives it if that directory is already different
+    def give(self, row):
+        if self.stack and self.stack[-1][3] is not None:
+            self.stack[-1][3].append(row)
+        else:
+            yield row
+
+    # gives every held back row, in walk order (outer directories hold the earlier rows)
+    def release(self):
+        for state in self.stack:
+            if state[3] is not None:
+                yield from state[3]
+                state[3] = None
+
+    # adds a file to the innermost directory's counts and hashes
+    def add_file(self, record):
+        directory, prod_hash, dev_hash, _ = self.stack[-1]
+        name = record.entry
+        if record.prod_size is not None:
+            prod_hash.update(f"{name}\0{record.prod_size}\0{record.prod_hash}\n".encode())
+        if record.dev_size is not None:
+            dev_hash.update(f"{name}\0{record.dev_size}\0{record.dev_hash}\n".encode())
+
+        directory.files += 1
+        if record.is_identical():
+            directory.identical += 1
+        elif record.prod_size is not None and record.dev_size is not None:
+            directory.changed += 1
+        elif record.dev_size is not None:
+            directory.added += 1
+        else:
+            directory.removed += 1
+        self.add_totals(directory, record)
+
+    # adds a record's sizes, times, code and content match, similarity and failed links to a directory's
+    def add_totals(self, directory, record):
+        if record.prod_size is not None:
+            directory.prod_size = (directory.prod_size or 0) + record.prod_size
+            directory.prod_modified = max(directory.prod_modified or 0, record.prod_modified)
+        if record.dev_size is not None:
+            directory.dev_size = (directory.dev_size or 0) + record.dev_size
+            directory.dev_modified = max(directory.dev_modified or 0, record.dev_modified)
+        if record.code_match is not None:
+            directory.code_match = record.code_match and directory.code_match is not False
+        if record.content_match is not None:
+            directory.content_match = record.content_match and directory.content_match is not False
+        if record.similarity is not None:
+            directory.similarity = min(record.similarity, 1 if directory.similarity is None else directory.similarity)
+        if record.links_prod is not None:
+            directory.links_prod = (directory.links_prod or 0) + record.links_prod
+        if record.links_dev is not None:
+            directory.links_dev = (directory.links_dev or 0) + record.links_dev
+        if record.unchecked_prod is not None:
+            directory.unchecked_prod = (directory.unchecked_prod or 0) + record.unchecked_prod
+        if record.unchecked_dev is not None:
+            directory.unchecked_dev = (directory.unchecked_dev or 0) + record.unchecked_dev
+
+    # closes the innermost directory: hashes it into its parent and gives its rows (collapsed if identical)
+    def close_directory(self):
+        directory, prod_hash, dev_hash, held = self.stack.pop()
+        if directory.prod_size is not None:
+            directory.prod_hash = prod_hash.hexdigest()
+        if directory.dev_size is not None:
+            directory.dev_hash = dev_hash.hexdigest()
+        self.summaries.append(directory)
+
+        if self.stack:
+            parent, parent_prod_hash, parent_dev_hash, _ = self.stack[-1]
+            name = directory.prefix[len(parent.prefix):]
+            if directory.prod_hash is not None:
+                parent_prod_hash.update(f"{name}\0{directory.prod_hash}\n".encode())
+            if directory.dev_hash is not None:
+                parent_dev_hash.update(f"{name}\0{directory.dev_hash}\n".encode())
+            for count in ("files", "identical", "changed", "added", "removed"):
+                setattr(parent, count, getattr(parent, count) + getattr(directory, count))
+            self.add_totals(parent, directory)
+
+        # rows still held back: the subtree is identical (or empty)
+        if held is None:
+            return
+        if not directory.is_identical():
+            yield from self.release()
+            yield from held
+        elif self.is_expanded(directory.prefix):
+            for row in held:
+                yield from self.give(row)
+        else:
+            yield from self.give(directory)
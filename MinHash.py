@@ -0,0 +1,63 @@
+"""
+File: MinHash.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Small similarity sketches of code (one-permutation MinHash over token shingles).
+Two sketches give an estimated similarity without diffing, and their bands find likely pairs without comparing all.
+"""
+import re
+import hashlib
+
+# number of values in a sketch, and tokens per shingle
+SKETCH_SIZE = 64
+SHINGLE_SIZE = 5
+# bands (of SKETCH_SIZE / BANDS values) for finding candidate pairs, about 50% similar pairs share a band
+BANDS = 16
+# shingle hashes are 64 bits, empty bins are filled from the next bin with an offset of this per step
+HASH_SPACE = 1 << 64
+FILL_OFFSET = HASH_SPACE // SKETCH_SIZE
+
+# words and single symbols, whitespace and layout are left out
+TOKEN_PATTERN = re.compile(r'\w+|[^\w\s]')
+
+
+# gives the sketch of a text (tuple of SKETCH_SIZE numbers), None if it has no tokens
+def make_sketch(text):
+    tokens = TOKEN_PATTERN.findall(text)
+    if not tokens:
+        return None
+    # short texts are one shingle
+    count = max(len(tokens) - SHINGLE_SIZE + 1, 1)
+
+    # one hash per shingle, the bin is picked by the hash and keeps its smallest value
+    bins = [None] * SKETCH_SIZE
+    for i in range(count):
+        shingle = "\0".join(tokens[i:i + SHINGLE_SIZE]).encode('utf-8', errors='replace')
+        value = int.from_bytes(hashlib.blake2b(shingle, digest_size=8).digest(), 'little')
+        index = value % SKETCH_SIZE
+        value //= SKETCH_SIZE
+        if bins[index] is None or value < bins[index]:
+            bins[index] = value
+
+    # empty bins take the next filled bin's value (wrapping around), offset by the distance
+    sketch = list(bins)
+    for index in range(SKETCH_SIZE):
+        if sketch[index] is None:
+            step = 1
+            while bins[(index + step) % SKETCH_SIZE] is None:
+                step += 1
+            sketch[index] = bins[(index + step) % SKETCH_SIZE] + step * FILL_OFFSET
+    return tuple(sketch)
+
+
+# gives the estimated similarity (0 to 1) of two sketches, None if either is missing
+def estimate_similarity(sketch1, sketch2):
+    if sketch1 is None or sketch2 is None:
+        return None
+    return sum(1 for value1, value2 in zip(sketch1, sketch2) if value1 == value2) / SKETCH_SIZE
+
+
+# gives the band keys of a sketch, sketches sharing a key are candidate pairs
+def band_keys(sketch):
+    rows = SKETCH_SIZE // BANDS
+    return [(band, sketch[band * rows:(band + 1) * rows]) for band in range(BANDS)]
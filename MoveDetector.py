@@ -0,0 +1,108 @@
+"""
+File: MoveDetector.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Pairs files found on one side only with a file of the same content on the other side, as moved or
+renamed, instead of one PROD. row and one DEV. row. Only the one-sided files are held, indexed by content hash.
+Code files left unpaired are then paired by MinHash sketch when they are similar enough (moved and edited).
+"""
+from collections import deque
+from FileRecord import FileRecord, Found
+from MinHash import band_keys, estimate_similarity
+
+# lowest estimated similarity for pairing edited files
+MIN_SIMILARITY = 0.5
+# sketches sharing a band with more files than this are not compared through it (boilerplate files)
+MAX_BUCKET = 64
+
+
+class MoveDetector:
+    def __init__(self, is_code=None, min_similarity=MIN_SIMILARITY):
+        # when given (code check on), pairs of code files get a code match and similarity
+        self.is_code = is_code
+        self.min_similarity = min_similarity
+        # content hash -> one-sided records waiting for a match, per side
+        self.prod_index = {}
+        self.dev_index = {}
+        # one-sided records not paired yet, in walk order (keyed by id)
+        self.held = {}
+
+    # gives the records, exact pairs as soon as both sides are seen, similar pairs and unpaired files at the end
+    def iter_records(self, records):
+        for record in records:
+            content_hash = record.prod_hash if record.found == Found.PROD else record.dev_hash
+            # found on both sides, not hashed, or empty (every empty file has the same hash)
+            if not isinstance(record, FileRecord) or record.found not in (Found.PROD, Found.DEV) or \
+                    content_hash is None or not (record.prod_size or record.dev_size):
+                yield record
+                continue
+
+            index, other_index = (self.prod_index, self.dev_index) if record.found == Found.PROD \
+                else (self.dev_index, self.prod_index)
+            # same content seen on the other side: pair them, first come first paired
+            if other_index.get(content_hash):
+                other = other_index[content_hash].popleft()
+                if not other_index[content_hash]:
+                    del other_index[content_hash]
+                del self.held[id(other)]
+                yield self.make_pair(other, record) if record.found == Found.DEV else self.make_pair(record, other)
+            else:
+                index.setdefault(content_hash, deque()).append(record)
+                self.held[id(record)] = record
+
+        yield from self.pair_similar()
+        yield from self.held.values()
+        self.prod_index = {}
+        self.dev_index = {}
+        self.held = {}
+
+    # pairs unpaired one-sided files with sketches, most similar first, comparing only files that share a band
+    def pair_similar(self):
+        buckets = {}
+        for record in self.held.values():
+            if record.found == Found.PROD and record.sketch is not None:
+                for key in band_keys(record.sketch):
+                    buckets.setdefault(key, []).append(record)
+
+        candidates = []
+        for record in self.held.values():
+            if record.found != Found.DEV or record.sketch is None:
+                continue
+            compared = set()
+            for key in band_keys(record.sketch):
+                bucket = buckets.get(key, [])
+                if len(bucket) > MAX_BUCKET:
+                    continue
+                for prod_record in bucket:
+                    if id(prod_record) in compared:
+                        continue
+                    compared.add(id(prod_record))
+                    similarity = estimate_similarity(prod_record.sketch, record.sketch)
+                    if similarity >= self.min_similarity:
+                        candidates.append((similarity, prod_record, record))
+
+        # each file is paired once, walk order breaks ties
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        for similarity, prod_record, dev_record in candidates:
+            if id(prod_record) in self.held and id(dev_record) in self.held:
+                del self.held[id(prod_record)]
+                del self.held[id(dev_record)]
+                yield self.make_pair(prod_record, dev_record, min(similarity, 0.99))
+
+    # one record for a prod. file and its dev. copy: renamed in the same directory, moved otherwise
+    # similarity is 1 for exact copies
+    def make_pair(self, prod_record, dev_record, similarity=1.0):
+        record = FileRecord(dev_record.prefix, dev_record.entry,
+                            prod_size=prod_record.prod_size, dev_size=dev_record.dev_size,
+                            prod_modified=prod_record.prod_modified, dev_modified=dev_record.dev_modified,
+                            links_prod=prod_record.links_prod, links_dev=dev_record.links_dev,
+                            prod_hash=prod_record.prod_hash, dev_hash=dev_record.dev_hash)
+        record.found = Found.RENAMED if prod_record.prefix == dev_record.prefix else Found.MOVED
+        record.moved_from = prod_record.get_path()
+        record.unchecked_prod = prod_record.unchecked_prod
+        record.unchecked_dev = dev_record.unchecked_dev
+        record.dev_only_links = dev_record.dev_only_links
+        if self.is_code is not None and self.is_code(dev_record.entry):
+            record.code_match = similarity == 1
+            record.similarity = similarity
+        return record
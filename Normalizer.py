@@ -0,0 +1,84 @@
+"""
+File: Normalizer.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Rewrites code before it is hashed or diffed, so differences that do not matter between mirrors
+(the site's own hostnames, ?ver= strings, nonces, CSRF tokens, timestamps, trailing whitespace) are not seen as changes.
+"""
+import re
+import json
+import hashlib
+
+# absolute URLs (also JSON-escaped ones) to one of the site's hosts, {hosts} is filled in per site
+HOSTNAME_PATTERN = r'(?i)\bhttps?:(?:\\?/){{2}}(?:{hosts})(?::\d+)?(?![\w.-])'
+
+# ready-made rules: (regex, replacement), applied to one line at a time
+PRESETS = {
+    # absolute URLs to the site itself keep only their path, other hosts (CDNs, APIs) are left as they are
+    # the rule is made from the site hosts (make_hostname_rules), none without them
+    "hostnames": [],
+    # cache-busting query strings keep their name only
+    "cache_busting": [(r'([?&](?:ver|v|version|rev|cb|_|t|ts|timestamp)=)[\w.-]+', r'\1')],
+    # nonces, such as WordPress' _wpnonce and script nonce attributes
+    "nonces": [(r'(?i)((?:_wp)?nonce["\']?\s*[:=]\s*["\']?)[\w+/=-]{6,}', r'\1')],
+    # CSRF tokens in meta tags, hidden inputs and scripts
+    "csrf": [(r'(?i)((?:csrf[_-]?token|csrfmiddlewaretoken|authenticity_token|xsrf[_-]?token|_token)["\']?'
+              r'(?:\s+content=|\s+value=|\s*[:=]\s*)["\']?)[\w+/=.-]{8,}', r'\1')],
+    # build and page generation times: ISO dates and Unix times (seconds or milliseconds, 2017 to 2033)
+    "timestamps": [(r'\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?', 'TIMESTAMP'),
+                   (r'\b1[5-9]\d{8}(?:\d{3})?\b', 'TIMESTAMP')],
+    # spaces, tabs and carriage returns at the end of lines
+    "whitespace": [(r'[ \t\r]+(?=\n?\Z)', '')]
+}
+
+# every preset, for mirrors made with Wget
+MIRROR_PRESETS = list(PRESETS)
+
+
+# reads a user rule, 'regex => replacement' or just 'regex' (removed)
+def parse_rule(rule):
+    pattern, _, replacement = rule.partition(' => ')
+    return pattern, replacement
+
+
+# the hostnames rule for a site's hosts (mirror folder names or given by the user), none without hosts
+def make_hostname_rules(site_hosts):
+    hosts = sorted({host.strip().lower() for host in site_hosts or [] if host.strip()}, key=len, reverse=True)
+    if not hosts:
+        return []
+    return [(HOSTNAME_PATTERN.format(hosts='|'.join(re.escape(host) for host in hosts)), '')]
+
+
+class Normalizer:
+    def __init__(self, presets=None, rules=None, site_hosts=None):
+        # (regex, replacement) pairs in order: presets first, then user rules
+        definitions = []
+        for preset in presets or []:
+            definitions += make_hostname_rules(site_hosts) if preset == "hostnames" else PRESETS[preset]
+        for rule in rules or []:
+            if rule.strip():
+                definitions.append(parse_rule(rule.strip()))
+
+        # compiled once, re.error for invalid user regexes
+        self.rules = [(re.compile(pattern), replacement) for pattern, replacement in definitions]
+        # same rules, same signature: cached fingerprints of normalized code are only reused with the same rules
+        self.signature = hashlib.sha1(json.dumps(definitions).encode('utf-8')).hexdigest()[:16]
+
+    # gives the signature of the rules
+    def get_signature(self):
+        return self.signature
+
+    # gives a normalized line
+    def normalize_line(self, line):
+        for pattern, replacement in self.rules:
+            line = pattern.sub(replacement, line)
+        return line
+
+    # gives normalized lines one at a time
+    def iter_lines(self, lines):
+        for line in lines:
+            yield self.normalize_line(line)
+
+    # gives normalized text, one line at a time (line endings kept)
+    def normalize_text(self, text):
+        return ''.join(self.iter_lines(text.splitlines(keepends=True)))
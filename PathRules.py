@@ -0,0 +1,107 @@
+"""
+File: PathRules.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Gitignore-style include/exclude rules for FileChecker and FTPFileChecker, compiled once.
+Excluded directories are skipped before they are listed, and code files are found with a single lookup.
+"""
+import re
+
+# file extensions looked for as code, add more if necessary
+CODE_EXTENSIONS = frozenset(['.html', '.css', '.js', '.php', '.xml', '.ts', '.sql', '.json', '.py'])
+
+# ready-made exclude rules
+PRESETS = {
+    # media uploads, caches and backups of WordPress sites
+    "wordpress": ["wp-content/uploads/", "wp-content/cache/", "wp-content/upgrade/", "wp-content/backup*/",
+                  "wp-content/ai1wm-backups/", "*.bak", "*.zip", "*.tar.gz", "*.sql.gz"]
+}
+
+
+# turns one gitignore-style pattern into a regex (without anchors)
+def translate_pattern(pattern):
+    regex = []
+    i = 0
+    while i < len(pattern):
+        # '**/' any directories (or none), '**' anything, '*' anything but '/', '?' one character but '/'
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            regex.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            regex.append('[^/]')
+            i += 1
+        # character class, such as [abc] or [!abc]
+        elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 1)
+            chars = pattern[i + 1:end]
+            if chars.startswith('!'):
+                chars = '^' + chars[1:]
+            regex.append('[' + chars.replace('\\', '\\\\') + ']')
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(regex)
+
+
+# compiles patterns into one regex matched against relative paths (no leading or trailing '/'), None if empty
+# with subpaths, paths inside a matching directory match as well
+def compile_patterns(patterns, subpaths=False):
+    end = '(?:/.*)?$' if subpaths else '$'
+    regexes = []
+    for pattern in patterns:
+        pattern = pattern.strip()
+        # blank lines and comments
+        if not pattern or pattern.startswith('#'):
+            continue
+        pattern = pattern.rstrip('/')
+        # a '/' at the start or in the middle ties the pattern to the top, else it matches at any depth
+        if '/' in pattern:
+            regexes.append('^' + translate_pattern(pattern.lstrip('/')) + end)
+        else:
+            regexes.append('(?:^|/)' + translate_pattern(pattern) + end)
+    if not regexes:
+        return None
+    return re.compile('|'.join(f'(?:{regex})' for regex in regexes))
+
+
+# splits text (one pattern per line or comma separated) into patterns
+def split_patterns(text):
+    if not text:
+        return []
+    return [pattern for line in text.splitlines() for pattern in line.split(',') if pattern.strip()]
+
+
+class PathRules:
+    def __init__(self, exclude=None, include=None, presets=None):
+        exclude = list(exclude or [])
+        for preset in presets or []:
+            exclude += PRESETS[preset]
+        include = list(include or [])
+
+        # patterns ending with '/' only match directories
+        self.exclude_dirs = compile_patterns(exclude)
+        self.exclude_files = compile_patterns([pattern for pattern in exclude if not pattern.strip().endswith('/')])
+        # if any include patterns are given, only matching files (or files in matching directories) are compared
+        self.include_files = compile_patterns(include, subpaths=True)
+
+    # True if the directory (relative path) should not be entered
+    def is_excluded_dir(self, rel_path):
+        return self.exclude_dirs is not None and self.exclude_dirs.search(rel_path) is not None
+
+    # True if the file (relative path) should be compared
+    def is_included_file(self, rel_path):
+        if self.exclude_files is not None and self.exclude_files.search(rel_path) is not None:
+            return False
+        return self.include_files is None or self.include_files.search(rel_path) is not None
+
+    # True if the file is code, ignoring anything after '@' (wget adds these)
+    def is_code(self, entry):
+        name = entry.split('@')[0]
+        return '.' in name and '.' + name.rpartition('.')[2].lower() in CODE_EXTENSIONS
@@ -0,0 +1,276 @@
+"""
+File: Renderers.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Turns FileRecords into output: a colored PrettyTable (terminal), an HTML table, JSON Lines or CSV.
+Rows are built once as colored text pieces, so no ANSI codes have to be converted afterwards.
+DirRecords are shown as one row for an identical subtree, or as rows of the per-directory summary.
+"""
+import csv
+import io
+import html
+import json
+import time
+from prettytable import PrettyTable
+from FileRecord import DirRecord, Found
+
+# color name -> (ANSI code, HTML color)
+COLORS = {
+    "red": ('91', 'red'),
+    "green": ('92', 'lightgreen'),
+    "yellow": ('93', 'yellow'),
+    "blue": ('94', 'blue'),
+    "white": ('97', 'white')
+}
+
+# color of a file by where it was found
+FOUND_COLORS = {Found.BOTH: "green", Found.PROD: "yellow", Found.DEV: "blue", Found.MOVED: "white",
+                Found.RENAMED: "white"}
+
+
+# columns of the per-directory summary
+SUMMARY_COLUMNS = ["Directory", "Found", "Files", "Identical", "Changed", "Added (DEV.)", "Removed (PROD.)",
+                   "Prod. Size (in Bytes)", "Dev. Size (in Bytes)"]
+
+
+# gives the column names, with the optional code, content and link columns
+def get_columns(code_check=False, link_check=False, summary=False, content_check=False):
+    if summary:
+        return SUMMARY_COLUMNS
+    columns = ["Filename", "Found"]
+    if code_check:
+        columns += ["Code Match", "Similarity", "Line Changes"]
+    if content_check:
+        columns += ["Content Match"]
+    if link_check:
+        columns += ["Links Failed (PROD.)", "Links Failed (DEV.)"]
+    return columns + ["Prod. Size (in Bytes)", "Dev. Size (in Bytes)", "Prod. Modified", "Dev. Modified"]
+
+
+# gives the pieces of a record's path, directories found on both sides are green
+# the rest take the color of the side they were found on
+def path_pieces(record):
+    color = FOUND_COLORS[record.found]
+    if record.found == Found.BOTH:
+        return [(record.prefix, "green")]
+    return [(directory + '/', "green" if depth < record.shared_depth else color)
+            for depth, directory in enumerate(record.prefix.split('/')[:-1])]
+
+
+# gives a summary row's cells, counts other than 0 take the color of what they count
+def summary_cells(record):
+    color = FOUND_COLORS[record.found]
+    cells = [path_pieces(record) if record.prefix else [("./", "green")], [(record.found.value, color)],
+             [(str(record.files), None)], [(str(record.identical), "green")]]
+    for count, count_color in ((record.changed, "red"), (record.added, "blue"), (record.removed, "yellow")):
+        cells.append([(str(count), count_color if count else "green")])
+    for value in (record.prod_size, record.dev_size):
+        cells.append([(str(value), "white")] if value is not None else [("N/A", None)])
+    return cells
+
+
+# gives a record's cells, each a list of (text, color name or None) pieces
+def record_cells(record, code_check=False, link_check=False, summary=False, content_check=False):
+    if summary:
+        return summary_cells(record)
+    color = FOUND_COLORS[record.found]
+
+    # identical subtrees are one row: the directory and how many files it holds
+    if isinstance(record, DirRecord):
+        filename = [(record.get_path(), color), (f" ({record.files} identical files)", None)]
+    # moved/renamed files: the prod. path, then the dev. path
+    elif record.moved_from is not None:
+        filename = [(record.moved_from, FOUND_COLORS[Found.PROD]), (" -> ", None),
+                    (record.get_path(), FOUND_COLORS[Found.DEV])]
+    else:
+        filename = path_pieces(record) + [(record.entry, color)]
+    cells = [filename, [(record.found.value, color)]]
+
+    # green true for matching code, red false otherwise
+    # similarity: green when the same, yellow from half similar, red below
+    if code_check:
+        if record.code_match is None:
+            cells.append([("N/A", None)])
+        else:
+            cells.append([("TRUE", "green") if record.code_match else ("FALSE", "red")])
+        if record.similarity is None:
+            cells.append([("N/A", None)])
+        else:
+            similarity_color = "green" if record.similarity == 1 else "yellow" if record.similarity >= 0.5 else "red"
+            cells.append([(f"{round(record.similarity * 100)}%", similarity_color)])
+        # added, removed and changed lines of differing code
+        if record.line_changes is None:
+            cells.append([("N/A", None)])
+        else:
+            added, removed, changed = record.line_changes
+            cells.append([(f"+{added}", "green"), (" ", None), (f"-{removed}", "red"), (" ", None),
+                          (f"~{changed}", "yellow")])
+    # files that are not code: green true for the same content, red false with the changed byte ranges (if read)
+    if content_check:
+        if record.content_match is None:
+            cells.append([("N/A", None)])
+        elif record.content_match:
+            cells.append([("TRUE", "green")])
+        elif record.changed_ranges:
+            cells.append([("FALSE", "red"), (f" ({format_changed_ranges(record.changed_ranges)})", None)])
+        else:
+            cells.append([("FALSE", "red")])
+    # failed links on each side, green 0 for no failures, red number for failures
+    # dev. also lists its broken site links that work on prod. (resolved locally)
+    # links left unchecked when the time budget ran out are counted apart
+    if link_check:
+        for links_failed, unchecked in ((record.links_prod, record.unchecked_prod),
+                                        (record.links_dev, record.unchecked_dev)):
+            if links_failed is None:
+                cells.append([("N/A", None)])
+            else:
+                cells.append([(str(links_failed), "red" if links_failed > 0 else "green")])
+            if unchecked:
+                cells[-1].append((f" ({unchecked} unchecked)", "yellow"))
+        if record.dev_only_links:
+            cells[-1].append((f" (dev only: {format_dev_only_links(record.dev_only_links)})", "red"))
+
+    # found in both: if size and time differ red, else green; found on one side: white
+    size = "white"
+    change = "white"
+    if record.prod_size is not None and record.dev_size is not None:
+        size = "red" if record.prod_size != record.dev_size else "green"
+        change = "red" if time.ctime(record.prod_modified) != time.ctime(record.dev_modified) else "green"
+    for value in (record.prod_size, record.dev_size):
+        cells.append([(str(value), size)] if value is not None else [("N/A", None)])
+    for value in (record.prod_modified, record.dev_modified):
+        cells.append([(time.ctime(round(value)), change)] if value is not None else [("N/A", None)])
+
+    return cells
+
+
+# gives a record's raw values by column name (numbers, True/False, None when not found or checked)
+def record_values(record, code_check=False, link_check=False, summary=False, content_check=False):
+    if summary:
+        return dict(zip(SUMMARY_COLUMNS, [record.get_path(), record.found.value, record.files, record.identical,
+                                          record.changed, record.added, record.removed, record.prod_size,
+                                          record.dev_size]))
+    path = record.get_path()
+    if not isinstance(record, DirRecord) and record.moved_from is not None:
+        path = f"{record.moved_from} -> {path}"
+    values = {"Filename": path, "Found": record.found.value}
+    if code_check:
+        values["Code Match"] = record.code_match
+        values["Similarity"] = round(record.similarity, 2) if record.similarity is not None else None
+        values["Line Changes"] = format_line_changes(record.line_changes)
+    if content_check:
+        values["Content Match"] = record.content_match
+        values["Changed Ranges"] = format_changed_ranges(record.changed_ranges, limit=None)
+    if link_check:
+        values["Links Failed (PROD.)"] = record.links_prod
+        values["Links Failed (DEV.)"] = record.links_dev
+        values["Dev-only Broken Links"] = format_dev_only_links(record.dev_only_links, limit=None)
+        values["Links Unchecked (PROD.)"] = record.unchecked_prod
+        values["Links Unchecked (DEV.)"] = record.unchecked_dev
+    values["Prod. Size (in Bytes)"] = record.prod_size
+    values["Dev. Size (in Bytes)"] = record.dev_size
+    values["Prod. Modified"] = record.prod_modified
+    values["Dev. Modified"] = record.dev_modified
+    return values
+
+
+# gives (added, removed, changed) lines as text, such as '+3 -1 ~2', None when not diffed
+def format_line_changes(line_changes):
+    if line_changes is None:
+        return None
+    return "+{} -{} ~{}".format(*line_changes)
+
+
+# gives changed byte ranges as text, such as '0-65535, 131072-196607', at most limit ranges
+# None when not read
+def format_changed_ranges(changed_ranges, limit=3):
+    if changed_ranges is None:
+        return None
+    text = ", ".join(f"{start}-{end - 1}" for start, end in changed_ranges[:limit])
+    if limit is not None and len(changed_ranges) > limit:
+        text += f" (+{len(changed_ranges) - limit} more)"
+    return text
+
+
+# gives dev-only broken links as text, such as 'about.html (line 3), /img/logo.png (line 9)', at most limit links
+# None when not resolved locally
+def format_dev_only_links(links, limit=3):
+    if links is None:
+        return None
+    text = ", ".join(f"{url} (line {line_num})" for line_num, url in links[:limit])
+    if limit is not None and len(links) > limit:
+        text += f" (+{len(links) - limit} more)"
+    return text
+
+
+# cell text with ANSI colors
+def ansi_cell(cell):
+    return "".join(f"\033[{COLORS[color][0]}m{text}\033[0m" if color else text for text, color in cell)
+
+
+# cell text with HTML colors (escaped), empty pieces are left out
+def html_cell(cell):
+    return "".join(f'<span style="color: {COLORS[color][1]};">{html.escape(text)}</span>' if color
+                   else html.escape(text) for text, color in cell if text)
+
+
+# makes the (terminal) table for the checkers' records
+def make_file_table(code_check=False, link_check=False, summary=False, content_check=False):
+    columns = get_columns(code_check, link_check, summary, content_check)
+    file_table = PrettyTable([ansi_cell([(column, "white")]) for column in columns])
+    # format local paths to the left
+    file_table.align[ansi_cell([(columns[0], "white")])] = "l"
+    return file_table
+
+
+# adds a record to a table from make_file_table
+def add_table_row(file_table, record, code_check=False, link_check=False, summary=False, content_check=False):
+    file_table.add_row([ansi_cell(cell) for cell in record_cells(record, code_check, link_check, summary,
+                                                                 content_check)])
+
+
+# gives an HTML table of the records
+def render_html(records, code_check=False, link_check=False, summary=False, content_check=False):
+    lines = ["<table>", "    <thead>", "        <tr>"]
+    for column in get_columns(code_check, link_check, summary, content_check):
+        lines.append(f"            <th>{html_cell([(column, 'white')])}</th>")
+    lines += ["        </tr>", "    </thead>", "    <tbody>"]
+
+    for record in records:
+        cells = record_cells(record, code_check, link_check, summary, content_check)
+        # format local paths to the left
+        row = [f'<td style="text-align: left">{html_cell(cells[0])}</td>']
+        row += [f'<td style="text-align: center">{html_cell(cell)}</td>' for cell in cells[1:]]
+        lines.append("        <tr>" + "".join(row) + "</tr>")
+
+    lines += ["    </tbody>", "</table>"]
+    return "\n".join(lines)
+
+
+# gives the records as JSON Lines, one line at a time
+def iter_json_lines(records, code_check=False, link_check=False, summary=False, content_check=False):
+    for record in records:
+        yield json.dumps(record_values(record, code_check, link_check, summary, content_check)) + "\n"
+
+
+# gives the records as CSV (with a header line), one line at a time
+def iter_csv(records, code_check=False, link_check=False, summary=False, content_check=False):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = get_columns(code_check, link_check, summary, content_check)
+    # exports also give the changed byte ranges, after the content match, and the dev-only broken and unchecked links
+    if "Content Match" in columns:
+        columns.insert(columns.index("Content Match") + 1, "Changed Ranges")
+    if "Links Failed (DEV.)" in columns:
+        index = columns.index("Links Failed (DEV.)") + 1
+        columns[index:index] = ["Dev-only Broken Links", "Links Unchecked (PROD.)", "Links Unchecked (DEV.)"]
+    writer.writerow(columns)
+    for record in records:
+        values = record_values(record, code_check, link_check, summary, content_check).values()
+        writer.writerow(["" if value is None else value for value in values])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # header only, no records
+    if buffer.tell():
+        yield buffer.getvalue()
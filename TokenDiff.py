@@ -0,0 +1,77 @@
+"""
+File: TokenDiff.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Token-level diff for minified code (JS/CSS bundles on a few very long lines).
+Tokens are read from the raw bytes, diffed with LineDiff, and changes are given as byte ranges of both files.
+"""
+import re
+from LineDiff import get_opcodes
+
+# minified: lines this long on average, or any line at least this long
+MINIFIED_AVG_LINE = 300
+MINIFIED_MAX_LINE = 5000
+
+# strings, comments, numbers, names and single symbols (whitespace is skipped)
+TOKEN_PATTERN = re.compile(rb'"(?:[^"\\\n]|\\.)*"|\'(?:[^\'\\\n]|\\.)*\'|`(?:[^`\\]|\\.)*`|/\*.*?\*/|//[^\n]*'
+                           rb'|\d[\w.]*|[\w$#-]+|\S', re.DOTALL)
+
+
+# True if the code looks minified, judged by its line lengths (bytes or str)
+def is_minified(content):
+    if not content:
+        return False
+    newline = b'\n' if isinstance(content, bytes) else '\n'
+    lines = content.count(newline) + 1
+    if len(content) / lines >= MINIFIED_AVG_LINE:
+        return True
+    # one long line in an otherwise normal file (a bundled dependency)
+    start = 0
+    while start < len(content):
+        end = content.find(newline, start)
+        if end == -1:
+            end = len(content)
+        if end - start >= MINIFIED_MAX_LINE:
+            return True
+        start = end + 1
+    return False
+
+
+# gives the tokens of the code and their byte offsets, one at a time
+def iter_tokens(content):
+    for match in TOKEN_PATTERN.finditer(content):
+        yield match.group(), match.start()
+
+
+# gives the changed regions of two codes (bytes): (tag, start1, end1, start2, end2) byte ranges
+# tags are 'replace', 'delete' (only in the first) and 'insert' (only in the second)
+def diff_regions(content1, content2):
+    tokens1, offsets1 = split_tokens(content1)
+    tokens2, offsets2 = split_tokens(content2)
+
+    regions = []
+    for tag, i1, i2, j1, j2 in get_opcodes(tokens1, tokens2):
+        if tag == 'equal':
+            continue
+        regions.append((tag,) + byte_range(offsets1, tokens1, i1, i2, len(content1)) +
+                       byte_range(offsets2, tokens2, j1, j2, len(content2)))
+    return regions
+
+
+# gives the token list and the offset list of the code
+def split_tokens(content):
+    tokens = []
+    offsets = []
+    for token, offset in iter_tokens(content):
+        tokens.append(token)
+        offsets.append(offset)
+    return tokens, offsets
+
+
+# byte range of tokens i1 to i2, empty ranges sit where the other side's change goes
+def byte_range(offsets, tokens, i1, i2, size):
+    if i1 == i2:
+        start = offsets[i1] if i1 < len(offsets) else size
+        return start, start
+    return offsets[i1], offsets[i2 - 1] + len(tokens[i2 - 1])
+
@@ -5,15 +5,19 @@ Date: 2024-01-29
 Description: Web interface for Site Compare. Made to facilitate web development with FileChecker, CodeChecker,
 and LinkChecker classes. Allows users to web crawl, access ftp, file compare, code compare, and check links.
 """
-from flask import Flask, render_template, request
+from flask import Flask, Response, render_template, request
 import re
 import os
 from main import MainClass
+from DiffCache import DiffCache
 
 app = Flask(__name__)
 
 m = MainClass()
 
+# rendered code comparisons, shared by every request
+diff_cache = DiffCache()
+
 
 def apply_html_colors(content):
     # ANSI color to HTML color
@@ -116,6 +120,32 @@ def file_comp():
     path2 = request.form['path2']
     cc = request.form.get('cc', False)
     lc = request.form.get('lc', False)
+    # same-size files that are not code compared byte by byte
+    content = request.form.get('content', False)
+    # links tested again instead of using recent results
+    recheck = request.form.get('recheck', False)
+    # links to the site itself (relative, or to its hosts) looked up in the mirrors instead of requested
+    local = request.form.get('local', False)
+    hosts = request.form.get('hosts', '')
+    # only links that changed between the sides requested
+    changed = request.form.get('changed', False)
+    # seconds the link checks may take, links not tested by then are unchecked (deadline)
+    budget = m.parse_seconds(request.form.get('budget', ''))
+    # include/exclude rules
+    rules = m.make_rules(request.form.get('exclude', ''), request.form.get('include', ''),
+                         wordpress=request.form.get('wp', False))
+    # identical directories as one row (except the expanded ones), or a summary row per directory
+    collapse = request.form.get('collapse', False)
+    expand = request.form.get('expand', '')
+    summary = request.form.get('summary', False)
+    # files found on one side only paired as moved/renamed
+    moves = request.form.get('moves', False)
+    # code normalized before it is compared (mirror presets and/or 'regex => replacement' rules)
+    try:
+        normalizer = m.make_normalizer(request.form.get('normalize', False), request.form.get('normalize_rules', ''),
+                                       hosts, (path1, path2))
+    except re.error as e:
+        return render_template('file_comp.html', result=f"Invalid normalization rule: {e}")
 
     # check if the user provided valid paths
     if m.check_path(path1) == "Invalid path":
@@ -133,15 +163,26 @@ def file_comp():
     if not os.path.isdir(path2):
         return render_template('file_comp.html', result="Path 2 does not point to a directory!")
 
-    # get pretty table, make html
-    pretty_table = m.file_comp(path1, path2, cc=cc, lc=lc)
-    table_html = pretty_table.get_html_string()
-
-    # remove ANSI add HTML color
-    table_html = apply_html_colors(table_html)
+    # JSON Lines and CSV are downloaded, rows are sent as they are found
+    out_format = request.form.get('format', 'html')
+    if out_format in ('jsonl', 'csv'):
+        mimetype = 'text/csv' if out_format == 'csv' else 'application/x-ndjson'
+        return Response(m.file_comp_export(path1, path2, out_format, cc=cc, lc=lc, rules=rules, collapse=collapse,
+                                           expand=expand, summary=summary, moves=moves, normalizer=normalizer,
+                                           content=content, recheck=recheck, local=local, hosts=hosts,
+                                           changed=changed, budget=budget),
+                        mimetype=mimetype,
+                        headers={'Content-Disposition': f'attachment; filename=file_comp.{out_format}'})
+
+    # html table, colored directly
+    table_html = m.file_comp_html(path1, path2, cc=cc, lc=lc, rules=rules, collapse=collapse, expand=expand,
+                                  summary=summary, moves=moves, normalizer=normalizer, content=content,
+                                  recheck=recheck, local=local, hosts=hosts, changed=changed, budget=budget)
 
     # result page
-    return render_template('fc_result.html', result=table_html, p1=path1, p2=path2)
+    return render_template('fc_result.html', result=table_html, p1=path1, p2=path2,
+                           normalize=request.form.get('normalize', False),
+                           normalize_rules=request.form.get('normalize_rules', ''), hosts=hosts)
 
 
 # FTP file comparison page
@@ -157,6 +198,15 @@ def file_comp_ftp():
     path2 = request.form.get('path2', '')
     cc = request.form.get('cc', False)
     lc = request.form.get('lc', False)
+    # include/exclude rules
+    rules = m.make_rules(request.form.get('exclude', ''), request.form.get('include', ''),
+                         wordpress=request.form.get('wp', False))
+    # code normalized before it is compared (mirror presets and/or 'regex => replacement' rules)
+    try:
+        normalizer = m.make_normalizer(request.form.get('normalize', False), request.form.get('normalize_rules', ''),
+                                       sites=(path1, path2))
+    except re.error as e:
+        return render_template('file_comp_ftp.html', result=f"Invalid normalization rule: {e}")
 
     # add ftp:// to the front of host_url if not already there
     if host_url1[:6] != "ftp://":
@@ -224,19 +274,19 @@ def file_comp_ftp():
         return render_template('file_comp_ftp.html', result=res)
     # successes
     else:
-        # get pretty table, make html
-        pretty_table = m.file_comp_ftp(ftp1, ftp2, path1, path2, cc=cc, lc=lc)
-        table_html = pretty_table.get_html_string()
+        # html table, colored directly
+        table_html = m.file_comp_ftp_html(ftp1, ftp2, path1, path2, cc=cc, lc=lc, rules=rules, normalizer=normalizer,
+                                          recheck=request.form.get('recheck', False),
+                                          budget=m.parse_seconds(request.form.get('budget', '')))
 
         ftp1.quit()
         ftp2.quit()
 
-        # remove ANSI add HTML color
-        table_html = apply_html_colors(table_html)
-
         # result page
         return render_template('fc_ftp_result.html', result=table_html, host1=host_url1, host2=host_url2,
-                               user1=username1, user2=username2, pass1=password1, pass2=password2, p1=path1, p2=path2)
+                               user1=username1, user2=username2, pass1=password1, pass2=password2, p1=path1, p2=path2,
+                               normalize=request.form.get('normalize', False),
+                               normalize_rules=request.form.get('normalize_rules', ''))
 
 
 # code comparison page
@@ -245,20 +295,37 @@ def code_comp():
     local = request.form.get('local', '')
     path1 = request.form['path1']
     path2 = request.form['path2']
+    # lines shown around changes, empty for the whole files
+    context = m.parse_context(request.form.get('context', ''))
+    # code normalized before it is compared (mirror presets and/or 'regex => replacement' rules)
+    # paths are the sites' folders when the file comes from a file comparison (local)
+    try:
+        normalizer = m.make_normalizer(request.form.get('normalize', False), request.form.get('normalize_rules', ''),
+                                       request.form.get('hosts', ''), (path1, path2) if local else ())
+    except re.error as e:
+        return render_template('code_comp.html', result=f"Invalid normalization rule: {e}")
 
     # is there a local path (from file comparison)
     if len(local) > 0:
-        res = m.code_comp_files(path1 + '/' + local, path2 + '/' + local)
-    else:
-        res = m.code_comp_files(path1, path2)
+        path1 = path1 + '/' + local
+        path2 = path2 + '/' + local
 
-    # if successful (prettytable, nots str)
-    if type(res) != str:
-        # get pretty table, make html
-        table_html = res.get_html_string()
+    # same contents and options as an earlier comparison: its result is reused
+    key = diff_cache.file_key(path1, path2, context, normalizer.get_signature() if normalizer else "")
+    res = diff_cache.get(key) if key is not None else None
+    if res is None:
+        res = m.code_comp_files(path1, path2, context, normalizer)
 
-        # remove ANSI add HTML color
-        res = apply_html_colors(table_html)
+        # if successful (prettytable, nots str)
+        if type(res) != str:
+            # get pretty table, make html
+            table_html = res.get_html_string()
+
+            # remove ANSI add HTML color
+            res = apply_html_colors(table_html)
+
+        if key is not None:
+            diff_cache.put(key, res)
 
     return render_template('code_comp.html', result=res)
 
@@ -277,6 +344,13 @@ def code_comp_ftp():
     path2 = request.form.get('path2', '')
     content1 = ''
     content2 = ''
+    # code normalized before it is compared (mirror presets and/or 'regex => replacement' rules)
+    # paths are the sites' folders when the file comes from a file comparison (local)
+    try:
+        normalizer = m.make_normalizer(request.form.get('normalize', False), request.form.get('normalize_rules', ''),
+                                       sites=(path1, path2) if local else ())
+    except re.error as e:
+        return render_template('code_comp_ftp.html', result=f"Invalid normalization rule: {e}")
 
     # add ftp:// to the front of host_url if not already there
     if host_url1[:6] != "ftp://":
@@ -347,17 +421,25 @@ def code_comp_ftp():
     else:
         res = res + " Access to FTP 2 failed!"
 
-    # code comp if both contents were found
+    # code comp if both contents were found, same contents and options as an earlier comparison reuse its result
     if len(content1) > 1 and len(content2) > 1:
-        res = m.code_comp_strings(content1, content2)
+        context = m.parse_context(request.form.get('context', ''))
+        key = diff_cache.string_key(content1, content2, context, normalizer.get_signature() if normalizer else "")
+        cached = diff_cache.get(key)
+        if cached is not None:
+            res = cached
+        else:
+            res = m.code_comp_strings(content1, content2, context, normalizer)
 
-    # if successful (prettytable, nots str)
-    if type(res) != str:
-        # get pretty table, make html
-        table_html = res.get_html_string()
+            # if successful (prettytable, nots str)
+            if type(res) != str:
+                # get pretty table, make html
+                table_html = res.get_html_string()
 
-        # remove ANSI add HTML color
-        res = apply_html_colors(table_html)
+                # remove ANSI add HTML color
+                res = apply_html_colors(table_html)
+
+            diff_cache.put(key, res)
 
     return render_template('code_comp_ftp.html', result=res)
 
@@ -366,7 +448,9 @@ def code_comp_ftp():
 @app.route('/link_check', methods=['POST'])
 def link_check():
     url = request.form['url']
-    status = m.link_check(url)
+    # test again instead of using a recent result
+    recheck = request.form.get('recheck', False)
+    status = m.link_check(url, recheck)
     # remove ANSI add HTML color
     status = apply_html_colors(status)
     status = f"The url \'{url}\' is " + status
@@ -378,12 +462,16 @@ def link_check():
 def link_check_file():
     local = request.form.get('local', '')
     path = request.form['path']
+    # test links again instead of using recent results
+    recheck = request.form.get('recheck', False)
+    # seconds the link tests may take, links not tested by then are unchecked (deadline)
+    budget = m.parse_seconds(request.form.get('budget', ''))
 
     # is there a local path (from file comparison)
     if len(local) > 0:
-        out_list = m.links_check_file(path + '/' + local)
+        out_list = m.links_check_file(path + '/' + local, recheck, budget)
     else:
-        out_list = m.links_check_file(path)
+        out_list = m.links_check_file(path, recheck, budget)
 
     # failure
     if type(out_list) == str:
@@ -444,7 +532,8 @@ def link_check_ftp():
 
     # link check if content found
     if len(content) > 1:
-        out_list = m.links_check_string(content)
+        out_list = m.links_check_string(content, request.form.get('recheck', False),
+                                        m.parse_seconds(request.form.get('budget', '')))
         # failure
         if type(out_list) == str:
             return render_template('link_check_ftp.html', result=out_list)
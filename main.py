@@ -13,8 +13,13 @@ from urllib.parse import urlsplit
 from FileChecker import FileChecker
 from CodeChecker import CodeChecker
 from LinkChecker import LinkChecker
+from LinkCache import LinkCache
 from FTPDownloader import FTPDownloader
 from FTPFileChecker import FTPFileChecker
+from Renderers import make_file_table, add_table_row, render_html, iter_json_lines, iter_csv
+from PathRules import PathRules, split_patterns
+from Normalizer import Normalizer, MIRROR_PRESETS
+from LinkResolver import get_site_hosts
 
 
 class MainClass:
@@ -43,52 +48,151 @@ class MainClass:
                        f"Check the path for success."
             return f"Command triggered an error, exit code: {e.returncode}. Make sure URL is valid!"
 
-    # make use of FileChecker class
-    def file_comp(self, path1, path2, cc=False, lc=False):
+    # lines of context around changes from user input, None (whole code) if empty or not a number
+    def parse_context(self, context=""):
+        context = context.strip()
+        return int(context) if context.isdigit() else None
+
+    # seconds from user input (e.g. a time budget), None (no limit) if empty or not a number
+    def parse_seconds(self, seconds=""):
+        seconds = seconds.strip()
+        return int(seconds) if seconds.isdigit() else None
+
+    # include/exclude rules from user inputs (one pattern per line or comma separated), wordpress adds its preset
+    def make_rules(self, exclude="", include="", wordpress=False):
+        return PathRules(split_patterns(exclude), split_patterns(include), presets=["wordpress"] if wordpress else [])
+
+    # code normalization from user inputs: normalize adds every mirror preset, rules are 'regex => replacement'
+    # (one per line, commas belong to the regex), None if there is nothing to normalize, re.error for bad rules
+    # only the site's own hostnames are ignored: hosts (one per line or comma separated), else the site folders' names
+    def make_normalizer(self, normalize=False, rules="", hosts="", sites=()):
+        rules = [rule for rule in rules.splitlines() if rule.strip()]
+        if not normalize and not rules:
+            return None
+        site_hosts = set(split_patterns(hosts))
+        if not site_hosts:
+            for site in sites:
+                site_hosts |= get_site_hosts(site)
+        return Normalizer(MIRROR_PRESETS if normalize else [], rules, site_hosts)
+
+    # FileChecker for the options: collapse shows identical subtrees as one row, except expanded directories
+    # moves pairs files found on one side only with same-content files on the other side
+    # content compares same-size files that are not code byte by byte, recheck tests links without cached results
+    # local looks links to the site itself up in the mirrors, hosts (one per line or comma separated) are the site's
+    # changed only requests links that changed between the sides, budget (seconds) ends the link checks on time
+    def make_file_checker(self, path1, path2, cc=False, lc=False, rules=None, collapse=False, expand="",
+                          moves=False, normalizer=None, content=False, recheck=False, local=False, hosts="",
+                          changed=False, budget=None):
+        return FileChecker(path1, path2, code_check=cc, link_check=lc, rules=rules, collapse_identical=collapse,
+                           expand=split_patterns(expand), detect_moves=moves, normalizer=normalizer,
+                           content_check=content, recheck_links=recheck, local_links=local,
+                           site_hosts=split_patterns(hosts) or None, changed_links=changed, link_budget=budget)
+
+    # make use of FileChecker class, summary gives a row per directory instead of per file
+    def file_comp(self, path1, path2, cc=False, lc=False, rules=None, collapse=False, expand="", summary=False,
+                  moves=False, normalizer=None, content=False, recheck=False, local=False, hosts="", changed=False,
+                  budget=None):
         print("Loading...")
 
-        fc = FileChecker(path1, path2, code_check=cc, link_check=lc)
+        fc = self.make_file_checker(path1, path2, cc, lc, rules, collapse, expand, moves, normalizer, content, recheck,
+                                    local, hosts, changed, budget)
+        if summary:
+            file_table = make_file_table(summary=True)
+            for record in fc.make_summary():
+                add_table_row(file_table, record, summary=True)
+            return file_table
         fc.make_table()
         return fc.get_file_table()
 
-    def file_comp_ftp(self, ftp1, ftp2, path1, path2, cc=False, lc=False):
+    # make use of FileChecker class, gives an HTML table
+    def file_comp_html(self, path1, path2, cc=False, lc=False, rules=None, collapse=False, expand="",
+                       summary=False, moves=False, normalizer=None, content=False, recheck=False, local=False,
+                       hosts="", changed=False, budget=None):
         print("Loading...")
 
-        fc = FTPFileChecker(ftp1, ftp2, path1, path2, code_check=cc, link_check=lc)
+        fc = self.make_file_checker(path1, path2, cc, lc, rules, collapse, expand, moves, normalizer, content, recheck,
+                                    local, hosts, changed, budget)
+        if summary:
+            return render_html(fc.make_summary(), summary=True)
+        return render_html(fc.iter_records(), code_check=cc, link_check=lc, content_check=content)
+
+    # make use of FileChecker class, gives JSON Lines ('jsonl') or CSV ('csv') one line at a time
+    def file_comp_export(self, path1, path2, out_format, cc=False, lc=False, rules=None, collapse=False, expand="",
+                         summary=False, moves=False, normalizer=None, content=False, recheck=False, local=False,
+                         hosts="", changed=False, budget=None):
+        print("Loading...")
+
+        fc = self.make_file_checker(path1, path2, cc, lc, rules, collapse, expand, moves, normalizer, content, recheck,
+                                    local, hosts, changed, budget)
+        records = fc.make_summary() if summary else fc.iter_records()
+        if out_format == "csv":
+            return iter_csv(records, code_check=cc, link_check=lc, summary=summary, content_check=content)
+        return iter_json_lines(records, code_check=cc, link_check=lc, summary=summary, content_check=content)
+
+    def file_comp_ftp(self, ftp1, ftp2, path1, path2, cc=False, lc=False, rules=None, normalizer=None,
+                      recheck=False, budget=None):
+        print("Loading...")
+
+        fc = FTPFileChecker(ftp1, ftp2, path1, path2, code_check=cc, link_check=lc, rules=rules,
+                            normalizer=normalizer, recheck_links=recheck, link_budget=budget)
         fc.make_table()
         return fc.get_file_table()
 
+    # make use of FTPFileChecker class, gives an HTML table
+    def file_comp_ftp_html(self, ftp1, ftp2, path1, path2, cc=False, lc=False, rules=None, normalizer=None,
+                           recheck=False, budget=None):
+        print("Loading...")
+
+        fc = FTPFileChecker(ftp1, ftp2, path1, path2, code_check=cc, link_check=lc, rules=rules,
+                            normalizer=normalizer, recheck_links=recheck, link_budget=budget)
+        return render_html(fc.iter_records(), code_check=cc, link_check=lc)
+
     # make use of CodeChecker class (local file)
-    def code_comp_files(self, file1, file2):
+    # context (lines) shows only the changed parts, None for the whole files
+    def code_comp_files(self, file1, file2, context=None, normalizer=None):
         print("Loading...")
 
-        cc = CodeChecker(path1=file1, path2=file2)
-        cc.compare_files()
+        cc = CodeChecker(path1=file1, path2=file2, normalizer=normalizer)
+        cc.compare_files(context)
         return cc.get_result()
 
     # make use of CodeChecker class (str)
-    def code_comp_strings(self, content1, content2):
+    def code_comp_strings(self, content1, content2, context=None, normalizer=None):
         print("Loading...")
 
-        cc = CodeChecker(str1=content1, str2=content2)
-        cc.compare_strings()
+        cc = CodeChecker(str1=content1, str2=content2, normalizer=normalizer)
+        cc.compare_strings(context)
         return cc.get_result()
 
     # make use of CodeChecker class' link checking (local file)
-    def links_check_file(self, path):
-        cc = CodeChecker(path1=path)
-        return cc.check_links_print_file()
-
-    # make use of CodeChecker class' link checking (str)
-    def links_check_string(self, content):
-        cc = CodeChecker(str1=content)
-        return cc.check_links_print_string()
-
-    # uses LinkChecker to test a URL
-    def link_check(self, url):
-        lc = LinkChecker()
-        lc.link_check(url)
-        return lc.get_status()
+    # recent results are reused (LinkCache), recheck tests every link again
+    # budget (seconds) ends the link tests on time, links not tested by then are unchecked (deadline)
+    def links_check_file(self, path, recheck=False, budget=None):
+        link_cache = LinkCache(refresh=recheck)
+        try:
+            cc = CodeChecker(path1=path, link_cache=link_cache, link_budget=budget)
+            return cc.check_links_print_file()
+        finally:
+            link_cache.close()
+
+    # make use of CodeChecker class' link checking (str), recheck and budget as links_check_file
+    def links_check_string(self, content, recheck=False, budget=None):
+        link_cache = LinkCache(refresh=recheck)
+        try:
+            cc = CodeChecker(str1=content, link_cache=link_cache, link_budget=budget)
+            return cc.check_links_print_string()
+        finally:
+            link_cache.close()
+
+    # uses LinkChecker to test a URL, recheck as links_check_file
+    def link_check(self, url, recheck=False):
+        link_cache = LinkCache(refresh=recheck)
+        try:
+            lc = LinkChecker(cache=link_cache)
+            lc.link_check(url)
+            return lc.get_status()
+        finally:
+            link_cache.close()
 
     # checks a full path, if make == True: path is created, otherwise: must be validated
     def get_check_path(self, make=False):
@@ -0,0 +1,54 @@
+"""
+File: test_collapse.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Checks that collapsed identical directories render with every column turned on (pytest).
+"""
+import json
+from FileChecker import FileChecker
+from Renderers import make_file_table, add_table_row, render_html, iter_json_lines, iter_csv
+
+# every optional column
+FLAGS = {"code_check": True, "link_check": True, "content_check": True}
+
+
+# makes the same tree on both sides, with one changed code file and one changed file that is not code
+def make_sites(tmp_path):
+    for side in ("prod", "dev"):
+        for path, content in (("same/a.html", "<p>same</p>\n"), ("same/deep/b.css", "p {}\n"),
+                              ("same/img.bin", "0000"), ("page.html", f"<p>{side}</p>\n"),
+                              ("image.bin", "1111" if side == "prod" else "2222")):
+            (tmp_path / side / path).parent.mkdir(parents=True, exist_ok=True)
+            (tmp_path / side / path).write_text(content)
+    return str(tmp_path / "prod"), str(tmp_path / "dev")
+
+
+# gives the records of a collapsed comparison with every column
+def get_records(tmp_path):
+    prod, dev = make_sites(tmp_path)
+    checker = FileChecker(prod, dev, use_cache=False, collapse_identical=True, detect_moves=True,
+                          code_check=FLAGS["code_check"], link_check=FLAGS["link_check"],
+                          content_check=FLAGS["content_check"])
+    return list(checker.iter_records())
+
+
+def test_collapsed_directory_renders_with_every_column(tmp_path):
+    records = get_records(tmp_path)
+    assert [record.get_path() for record in records] == ["image.bin", "page.html", "same/"]
+    assert records[-1].content_match is True
+
+    file_table = make_file_table(**FLAGS)
+    for record in records:
+        add_table_row(file_table, record, **FLAGS)
+    assert "same/" in file_table.get_string()
+    assert "same/" in render_html(records, **FLAGS)
+    assert [json.loads(line)["Filename"] for line in iter_json_lines(records, **FLAGS)][-1] == "same/"
+    assert len("".join(iter_csv(records, **FLAGS)).splitlines()) == len(records) + 1
+
+
+def test_expanded_directory_keeps_its_parents_open(tmp_path):
+    prod, dev = make_sites(tmp_path)
+    checker = FileChecker(prod, dev, use_cache=False, collapse_identical=True, expand=["same/deep"])
+    paths = [record.get_path() for record in checker.iter_records()]
+    assert "same/" not in paths
+    assert "same/deep/b.css" in paths and "same/a.html" in paths
@@ -0,0 +1,39 @@
+"""
+File: test_links.py
+Author: Aidan David
+Date: 2026-10-18
+Description: Checks that links are only read from real link attributes, CSS and absolute urls, and that
+mirrored links are found in the mirror (pytest).
+"""
+from LinkExtractor import extract_links
+from LinkResolver import LinkResolver
+
+PAGE = """<link rel="stylesheet" href="/css/site.css?ver=1&amp;b=2">
+<script src="/js/app.js">
+  el.src = x;
+  el.href = "https://example.com/script";
+</script>
+<img data-src="lazy.png" src="real.png" title="not href=fake">
+<style>p { background: url("bg.png") }</style>
+"""
+
+
+def test_links_come_from_tags_css_and_absolute_urls():
+    assert extract_links(PAGE) == [(1, "/css/site.css?ver=1&b=2"), (2, "/js/app.js"),
+                                   (4, "https://example.com/script"), (6, "real.png"), (7, "bg.png")]
+
+
+def test_code_outside_tags_gives_no_attributes():
+    assert extract_links("el.src = x;\nif (a<b && c>d) { img.href = y; }\n") == []
+
+
+def test_versioned_assets_are_found_in_the_mirror(tmp_path):
+    (tmp_path / "wp-includes" / "css").mkdir(parents=True)
+    (tmp_path / "wp-includes" / "css" / "style.css?ver=6.1").write_text("")
+    (tmp_path / "wp-includes" / "css" / "print.css@ver=6.1").write_text("")
+    resolver = LinkResolver(str(tmp_path))
+    target = resolver.resolve("index.html", "/wp-includes/css/style.css?ver=6.1")
+    assert target == "wp-includes/css/style.css?ver=6.1"
+    assert resolver.exists(target)
+    assert resolver.exists(resolver.resolve("index.html", "wp-includes/css/print.css?ver=6.1"))
+    assert not resolver.exists(resolver.resolve("index.html", "/wp-includes/css/style.css?ver=6.2"))